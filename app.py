@@ -1,298 +1,57 @@
-import pandas as pd
+import os
+
 import numpy as np
 import networkx as nx
-import plotly.express as px
 import plotly.graph_objects as go
-from dash import Dash, dcc, html, Input, Output, State
+from dash import Dash, dcc, html, Input, Output, State, Patch, ClientsideFunction
 import dash.exceptions
-from datetime import datetime
-
 
-# DATA LOADING
-ORG_ID = input('ID of the educational institution:')
-replace_dict = (
-    pd.read_csv(f'org_data/processed/{ORG_ID}/thesaurus_authors.txt', sep='\t')
-    .set_index('Label')
-    .to_dict()['Replace by']
-)
-publication = pd.read_csv(f'org_data/processed/{ORG_ID}/publications.csv')
-nodes = pd.read_csv(f'org_data/processed/{ORG_ID}/map.txt', sep='\t')
-edges = pd.read_csv(f'org_data/processed/{ORG_ID}/network.txt', sep='\t', names=['first_author','second_author','weight'], header=None)
-
-
-# DATA PROCESSING FUNCTIONS
-def standardize_author_names(names, replace_dict):
-    arr_authors = [name.replace('et al.', '').strip() for name in names.split(';')]
-    res = []
-    for name in arr_authors:
-        res.append(replace_dict.get(name, name).lower())
-    return res
-
-def build_description(row, max_display=3):
-    first = nodes.loc[nodes['id'] == row['first_author'], 'label'].iloc[0]
-    second = nodes.loc[nodes['id'] == row['second_author'], 'label'].iloc[0]
-
-    first_inform = authors_with_inform[authors_with_inform['Authors'] == first].iloc[0]
-    second_inform = authors_with_inform[authors_with_inform['Authors'] == second].iloc[0]
-
-    first_works = set(zip(first_inform['Title'], first_inform['Year'],
-                          first_inform['Source title'], first_inform['Cited by']))
-    second_works = set(zip(second_inform['Title'], second_inform['Year'],
-                           second_inform['Source title'], second_inform['Cited by']))
-    
-    common = sorted(first_works & second_works, key=lambda x: x[-1], reverse=True)
-
-    res = []
-    for number, inform in enumerate(common[:max_display], 1):
-        res.append(f"{number}. {inform[0]}, {inform[1]}")
-    total = len(common)
-    if total > max_display:
-        res.append(f"\nи ещё {total - max_display} совместных работ.")
-    return '<br>'.join(res)
-
-def id_to_name(ID):
-    return nodes.loc[nodes['id'] == ID, 'label'].iloc[0]
-
-def wrap_text(txt, width=50):
-    sentences = txt.split('<br>')
-    res = []
-    for sentence in sentences:
-        words = sentence.split(' ')
-        lines, cur = [], ''
-        for w in words:
-            if len(cur) + len(w) + 1 > width:
-                lines.append(cur)
-                cur = w
-            else:
-                cur = f"{cur} {w}".strip()
-        lines.append(cur)
-        res.append('<br>'.join(lines))
-    return '<br>'.join(res)
-
-
-# DATA PREPARING
-authors_with_inform = (
-    publication.assign(
-        Authors = lambda df: df['Authors'].apply(
-            standardize_author_names,
-            replace_dict=replace_dict
-        )
-    )
-    .explode('Authors')
-    .groupby('Authors', as_index=False)
-    .agg({
-        'Title': list,
-        'Year': list,
-        'Source title': list,
-        'Cited by': list,
-        'Link': list
-    })
-)
+from elibrary_parser.cache import FileSystemCache, MemoryCache
+from elibrary_parser.dashboard import OrganizationCache
+from elibrary_parser.logging_config import setup_logging
 
-# Build edge descriptions
-edges['hover_text'] = edges.apply(build_description, axis=1)
-# Convert IDs to names
-edges['first_author'] = edges['first_author'].apply(id_to_name)
-edges['second_author'] = edges['second_author'].apply(id_to_name)
 
-# Impossible years
-YEAR_NOW = datetime.now().year
-nodes['score<Avg. pub. year>'] = nodes['score<Avg. pub. year>'].apply(
-    lambda x: x if x <= YEAR_NOW else YEAR_NOW
-)
-# Clusters to colors
-COLORS = px.colors.qualitative.Plotly
-clusters = nodes['cluster'].unique()
-cluster_colors_map = {}
-for cl in clusters:
-    cluster_colors_map[cl] = COLORS[(cl-1) % len(COLORS)]
-nodes['node_color'] = nodes['cluster'].map(cluster_colors_map)
-
-# Create dictionaries for node properties
-label_with_coordinates = nodes.set_index('label')[['x', 'y']].to_dict('index')
-label_with_color = nodes.set_index('label')['node_color'].to_dict()
-
-# Initializing x range
-X_MIN, X_MAX = nodes['x'].min(), nodes['x'].max()
-initial_x_range = np.abs(X_MAX - X_MIN)
-last_x_range = initial_x_range
+# DATA LOADING
+# The organization is taken from the URL: http://127.0.0.1:8050/<org_id>
+DATA_PATH = os.environ.get('ELIBRARY_DATA_PATH', 'org_data')
+CACHE_SIZE = int(os.environ.get('ELIBRARY_CACHE_SIZE', 4))
+# Traces and node values of repeated interactions; a directory is shared by all worker processes
+RESULT_CACHE_DIR = os.environ.get('ELIBRARY_RESULT_CACHE_DIR')
+RESULT_CACHE_SIZE = int(os.environ.get('ELIBRARY_RESULT_CACHE_SIZE', 256))
+if RESULT_CACHE_DIR:
+    results = FileSystemCache(RESULT_CACHE_DIR, maxsize=RESULT_CACHE_SIZE)
+else:
+    results = MemoryCache(maxsize=RESULT_CACHE_SIZE)
+organizations = OrganizationCache(DATA_PATH, maxsize=CACHE_SIZE, results=results)
 
 # Option dictionaries
-size_options = []
-options = ['weight<Links>', 'weight<Total link strength>', 'weight<Documents>', 'weight<Citations>', 'weight<Norm. citations>']
-options_label = {'weight<Links>': 'Количество связей',
-                'weight<Total link strength>': 'Индекс связанности',
-                'weight<Documents>': 'Число публикаций',
-                'weight<Citations>': 'Число цитирований',
-                'weight<Norm. citations>': 'Норм. цитирования'}
-for col in nodes.columns:
-    if col in options:
-        size_options.append({'label': options_label[col], 'value': col})
-
-color_options = []
-options = ['score<Avg. pub. year>', 'score<Avg. citations>', 'score<Avg. norm. citations>']
-options_label = {'score<Avg. pub. year>': 'Ср. год публикаций',
+SIZE_LABELS = {'weight<Links>': 'Количество связей',
+               'weight<Total link strength>': 'Индекс связанности',
+               'weight<Documents>': 'Число публикаций',
+               'weight<Citations>': 'Число цитирований',
+               'weight<Norm. citations>': 'Норм. цитирования'}
+COLOR_LABELS = {'score<Avg. pub. year>': 'Ср. год публикаций',
                 'score<Avg. citations>': 'Ср. число цитирований',
                 'score<Avg. norm. citations>': 'Ср. норм. цитирования'}
-for col in nodes.columns:
-    if col in options:
-        color_options.append({'label': options_label[col], 'value': col})
-
-
-# GRAPH TRACING FUNCTIONS
-def build_traces():
-    segment_by_color = {}
-    mid_x, mid_y, edge_weight, edge_hover = [], [], [], []
-    for index, edge in edges.iterrows():
-        x1, y1 = label_with_coordinates[edge['first_author']]['x'], label_with_coordinates[edge['first_author']]['y']
-        x2, y2 = label_with_coordinates[edge['second_author']]['x'], label_with_coordinates[edge['second_author']]['y']
-
-        c1 = label_with_color[edge['first_author']]
-        c2 = label_with_color[edge['second_author']]
-
-        xm, ym = (x1 + x2)/2, (y1 + y2)/2
-        mid_x.append(xm)
-        mid_y.append(ym)
-        edge_weight.append(edge['weight'])
-        edge_hover.append(wrap_text(edge['hover_text']))
-        
-        for color, (xA, yA, xB, yB) in [(c1, (x1, y1, xm, ym)), (c2, (xm, ym, x2, y2))]:
-            seg = segment_by_color.setdefault(color, {'x': [], 'y': []})
-            seg['x'].extend([xA, xB, None])
-            seg['y'].extend([yA, yB, None])
-
-    edge_traces = []
-    for color, seg in segment_by_color.items():
-        edge_traces.append(go.Scattergl(
-            x = seg['x'],
-            y = seg['y'],
-            mode = 'lines',
-            hoverinfo='none',
-            line = dict(color=color),
-            opacity = 0.25,
-            name = 'Edges'
-        ))
-
-    weight_trace = go.Scattergl(
-        x = mid_x,
-        y = mid_y,
-        mode = 'markers+text',
-        marker = dict(size=9, color='#ffffff'),
-        text = edge_weight,
-        textposition = 'middle center',
-        hoverinfo = 'none',
-        textfont = dict(size=8, color='rgba(0,0,0,1)'),
-        name = 'EdgeWeights'
-    )
-    weight_trace_hover = go.Scattergl(
-        x = mid_x,
-        y = mid_y,
-        mode = 'markers',
-        marker = dict(size=9, color='#fff'),
-        opacity = 0,
-        hoverinfo = 'text',
-        hoverlabel=dict(font_color='#000'),
-        hovertext = edge_hover,
-        name = 'EdgeWeightsHover'
-    )
 
-    raw_sizes = nodes['weight<Links>']
-    sizes = 12 + 30 * (raw_sizes - raw_sizes.min()) / (raw_sizes.max() - raw_sizes.min())
-    font_size = 8 + 10 * (raw_sizes - raw_sizes.min()) / (raw_sizes.max() - raw_sizes.min())
-    font_size = font_size.clip(lower=8, upper=16)
-    text_colors = ['rgba(0,0,0,0)' for _ in sizes]
-    
-    node_trace = go.Scattergl(
-        x = nodes['x'],
-        y = nodes['y'],
-        mode = 'markers+text',
-        hoverinfo = 'text',
-        text = nodes['label'],
-        hovertext = nodes['label'],
-        marker = dict(size=sizes.tolist(), color=nodes['node_color']),
-        textposition = 'middle center',
-        hoverlabel = dict(font_color='#fff'),
-        textfont = dict(size=font_size.tolist(), color=text_colors),
-        name = 'Nodes'
-    )
-    node_trace_hover = go.Scattergl(
-        x = nodes['x'],
-        y = nodes['y'],
-        mode = 'markers',
-        hoverinfo = 'text',
-        hovertext = nodes['label'],
-        marker = dict(size=12, color=nodes['node_color']),
-        opacity = 0,
-        hoverlabel = dict(font_color='#fff'),
-        name = 'NodesHover'
-    )
-    
-    edge_traces = [weight_trace_hover] + edge_traces + [weight_trace]
-    return node_trace_hover, edge_traces, node_trace
-
-def update_edge_traces(edges, show_weights):
-    segment_by_color = {}
-    mid_x, mid_y, edge_weight, edge_hover = [], [], [], []
-    for index, edge in edges.iterrows():
-        x1, y1 = label_with_coordinates[edge['first_author']]['x'], label_with_coordinates[edge['first_author']]['y']
-        x2, y2 = label_with_coordinates[edge['second_author']]['x'], label_with_coordinates[edge['second_author']]['y']
-
-        c1 = label_with_color[edge['first_author']]
-        c2 = label_with_color[edge['second_author']]
-
-        xm, ym = (x1 + x2)/2, (y1 + y2)/2
-        mid_x.append(xm)
-        mid_y.append(ym)
-        edge_weight.append(edge['weight'])
-        edge_hover.append(wrap_text(edge['hover_text']))
-        
-        for color, (xA, yA, xB, yB) in [(c1, (x1, y1, xm, ym)), (c2, (xm, ym, x2, y2))]:
-            seg = segment_by_color.setdefault(color, {'x': [], 'y': []})
-            seg['x'].extend([xA, xB, None])
-            seg['y'].extend([yA, yB, None])
-
-    new_edge_traces = []
-    for color, seg in segment_by_color.items():
-        new_edge_traces.append(go.Scattergl(
-            x = seg['x'],
-            y = seg['y'],
-            mode = 'lines',
-            hoverinfo='none',
-            line = dict(color=color),
-            opacity = 0.25,
-            name = 'Edges'
-        ))
-    weight_trace = go.Scattergl(
-        x = mid_x,
-        y = mid_y,
-        mode = 'markers+text',
-        marker = dict(size=9, color='#ffffff'),
-        text = edge_weight,
-        textposition = 'middle center',
-        hoverinfo = 'none',
-        textfont = dict(
-            size = [8] * len(mid_x),
-            color = 'rgba(0,0,0,1)' if 'show' in show_weights else 'rgba(0,0,0,0)'
-        ),
-        name = 'EdgeWeights'
-    )
-    weight_trace_hover = go.Scattergl(
-        x = mid_x,
-        y = mid_y,
-        mode = 'markers',
-        marker = dict(size=9, color='#fff'),
-        opacity = 0,
-        hoverinfo = 'text',
-        hoverlabel=dict(font_color='#000'),
-        hovertext = edge_hover,
-        name = 'EdgeWeightsHover'
-    )
 
-    return [weight_trace_hover] + new_edge_traces + [weight_trace]
+def column_options(nodes, labels):
+    return [{'label': labels[col], 'value': col} for col in nodes.columns if col in labels]
+
+
+def get_network(pathname):
+    """ Network of the organization in the URL, the callback is cancelled if there is none """
+
+    network = organizations.get((pathname or '/').strip('/'))
+    if network is None:
+        raise dash.exceptions.PreventUpdate
+    return network
 
 
 # DASH
 app = Dash(__name__, suppress_callback_exceptions=True)
+# WSGI application for production servers, see wsgi.py
+server = app.server
 # Layout
 app.layout = html.Div([
     dcc.Location(id='url'),
@@ -301,8 +60,8 @@ app.layout = html.Div([
             html.Label('Размер вершин:'),
             dcc.Dropdown(
                 id = 'size-dropdown',
-                options = size_options,
-                value = size_options[0]['value']
+                options = [],
+                clearable = False
             )
         ], id='content__size'),
         html.Div([
@@ -310,12 +69,19 @@ app.layout = html.Div([
             dcc.Input(
                 id = 'edge-threshold',
                 type = 'number',
-                min = int(edges['weight'].min()),
-                max = int(edges['weight'].max()),
                 step = 1,
-                value = int(edges['weight'].min()),
             )
         ], id='content__filter_edge'),
+        html.Div([
+            html.Label('Годы публикаций:'),
+            dcc.RangeSlider(
+                id = 'year-range',
+                step = 1,
+                allowCross = False,
+                updatemode = 'mouseup',
+                tooltip = {'placement': 'bottom'}
+            )
+        ], id='content__years'),
         html.Div([
             html.Label('Поиск автора:'),
             html.Div([
@@ -330,6 +96,9 @@ app.layout = html.Div([
                 html.Button('', id = 'search-button', n_clicks = 0)
             ], id='content__search-button')
         ], id='content__search'),
+        html.Div([
+            dcc.RadioItems(id='search-results', options=[], value=None)
+        ], id='content__search-results'),
         html.Div([
             html.Button("Сбросить поиск", id = "reset-button", n_clicks = 0)
         ], id='content__reset'),
@@ -346,7 +115,7 @@ app.layout = html.Div([
             html.Div([
                 dcc.Dropdown(
                     id = 'color-by-dropdown',
-                    options = color_options,
+                    options = [],
                     placeholder = "Выберите показатель",
                 ),
             ], id='color-by-container', style={'display': 'none'}),
@@ -379,22 +148,103 @@ app.layout = html.Div([
                     'eraseshape'
                 ],
             },
-        )
+        ),
+        dcc.Tooltip(id='edge-tooltip', direction='bottom'),
+        dcc.Store(id='graph-meta'),
+        dcc.Store(id='viewport'),
+        dcc.Store(id='view')
     ], id='content__graph')
 ], id='content')
 
 
+# The found author, co-authors and co-authors of co-authors
+HOP_COLORS = ['red', '#ff8c69', '#ffc9a3']
+
+def ego_colors(network, node, view):
+    def compute():
+        traces = network.traces
+        hops = network.data.hops(node, max_hops=len(HOP_COLORS) - 1)
+        colors = np.full(len(traces.node_values(hops, view)), '#b0daff', dtype=object)
+        for hop in reversed(range(len(HOP_COLORS))):
+            colors[traces.node_values(hops == hop, view, how='any')] = HOP_COLORS[hop]
+        return colors.tolist()
+    return network.memoize('ego_colors', (node, view), compute)
+
+
+# Memoized computations: repeated interactions are served from the result cache
+def network_traces(network, view):
+    return network.memoize('traces', (view,), lambda: network.traces.traces(view=view))
+
+def network_edge_traces(network, threshold, show_weights, view, years):
+    return network.memoize('edge_traces', (threshold, show_weights, view, years),
+                           lambda: network.traces.edge_traces(threshold, show_weights, view, years))
+
+def network_node_traces(network, size_attr, view, years):
+    return network.memoize('node_traces', (size_attr, view, years),
+                           lambda: network.traces.node_traces(size_attr, view, years))
+
+def node_sizes(network, size_attr, view, years):
+    traces = network.traces
+    return network.memoize('node_sizes', (size_attr, view, years), lambda: traces.scaled_sizes(
+        traces.node_values(network.data.window_nodes(years)[size_attr], view)))
+
+def metric_colors(network, metric, view, years):
+    traces = network.traces
+    return network.memoize('metric_colors', (metric, view, years), lambda: traces.node_values(
+        network.data.window_nodes(years)[metric], view, how='mean').tolist())
+
+
 # CALLBACKES
 @app.callback(
     Output('network-graph', 'figure'),
-    Input('url', 'pathname')
+    Output('view', 'data', allow_duplicate=True),
+    Output('graph-meta', 'data'),
+    Output('size-dropdown', 'options'),
+    Output('size-dropdown', 'value'),
+    Output('edge-threshold', 'min'),
+    Output('edge-threshold', 'max'),
+    Output('edge-threshold', 'value'),
+    Output('year-range', 'min'),
+    Output('year-range', 'max'),
+    Output('year-range', 'value'),
+    Output('year-range', 'marks'),
+    Output('color-by-dropdown', 'options'),
+    Output('color-by-dropdown', 'value', allow_duplicate=True),
+    Output('search-results', 'options', allow_duplicate=True),
+    Output('search-results', 'value', allow_duplicate=True),
+    Input('url', 'pathname'),
+    prevent_initial_call='initial_duplicate'
 )
 def build_graph(pathname):
-    node_trace_hover, edge_traces, node_trace = build_traces()
-
-    fig = go.Figure(data = [node_trace_hover] + edge_traces + [node_trace])
+    org_id = (pathname or '/').strip('/')
+    network = organizations.get(org_id)
+    if network is None:
+        fig = go.Figure()
+        fig.add_annotation(
+            text = f"Нет данных организации {org_id}" if org_id else "Укажите ID организации в адресе страницы",
+            hovertext = "Доступные организации: " + ", ".join(organizations.organizations()),
+            showarrow = False,
+            font_size = 16
+        )
+        fig.update_layout(
+            plot_bgcolor='#f7f9ff',
+            xaxis=dict(visible=False),
+            yaxis=dict(visible=False),
+            margin = dict(l=0, r=0, t=0, b=0)
+        )
+        return fig, None, None, [], None, None, None, None, None, None, None, {}, [], '', [], None
+
+    traces = network.traces
+    weight = network.data.weight
+    years = network.data.years
+    first, last = (int(years[0]), int(years[-1])) if len(years) else (None, None)
+    year_marks = {int(year): str(year) for year in years if year % 5 == 0 or year in (first, last)}
+    size_options = column_options(network.nodes, SIZE_LABELS)
+    view = traces.view()
+    fig = go.Figure(data = network_traces(network, view))
     fig.update_layout(
         dragmode = 'pan',
+        uirevision = org_id,
         newshape=dict(
             line_color='#ffa294',
             opacity=0.8
@@ -424,142 +274,237 @@ def build_graph(pathname):
         )
     )
     
-    return fig
+    return (fig, view, network.meta, size_options, size_options[0]['value'],
+            int(weight.min()), int(weight.max()), int(weight.min()),
+            first, last, [first, last], year_marks,
+            column_options(network.nodes, COLOR_LABELS), '', [], None)
+
+@app.callback(
+    Output('edge-tooltip', 'show'),
+    Output('edge-tooltip', 'bbox'),
+    Output('edge-tooltip', 'children'),
+    Input('network-graph', 'hoverData'),
+    State('url', 'pathname'),
+)
+def show_edge_description(hover_data, pathname):
+    if not hover_data:
+        return False, dash.no_update, dash.no_update
+    point = hover_data['points'][0]
+    # Links between clusters have no description
+    if 'customdata' not in point or 'bbox' not in point or point['customdata'] < 0:
+        return False, dash.no_update, dash.no_update
+
+    lines = get_network(pathname).data.edge_description(int(point['customdata'])).split('<br>')
+    children = html.Div([html.Div(line) for line in lines], style={
+        'color': '#000', 'font-size': '13px', 'font-family': 'Arial', 'white-space': 'pre-line'
+    })
+    return True, point['bbox'], children
 
 @app.callback(
     Output('network-graph', 'figure', allow_duplicate=True),
     Input('size-dropdown', 'value'),
-    State('network-graph', 'figure'),
+    State('view', 'data'),
+    State('year-range', 'value'),
+    State('url', 'pathname'),
     prevent_initial_call=True
 )
-def update_size(size_attr, current_fig):
-    raw_sizes = nodes[size_attr]
-    sizes = 12 + 30 * (raw_sizes - raw_sizes.min()) / (raw_sizes.max() - raw_sizes.min())
-    font_size = 8 + 10 * (raw_sizes - raw_sizes.min()) / (raw_sizes.max() - raw_sizes.min())
-    font_size = font_size.clip(lower=8, upper=16)
-
-    node_trace = current_fig['data'][-1]
-    node_trace['marker']['size'] = sizes.tolist()
-    node_trace['textfont']['size'] = font_size.tolist()
-    current_fig['data'][-1] = node_trace
+def update_size(size_attr, view, years, pathname):
+    if size_attr is None:
+        raise dash.exceptions.PreventUpdate
+    network = get_network(pathname)
+    traces = network.traces
+    sizes, font_size = node_sizes(network, size_attr, view, years)
+
+    patched_fig = Patch()
+    patched_fig['data'][traces.nodes]['marker']['size'] = sizes.tolist()
+    patched_fig['data'][traces.nodes]['textfont']['size'] = font_size.tolist()
     
-    return current_fig
+    return patched_fig
 
 @app.callback(
     Output('network-graph', 'figure', allow_duplicate=True),
     Input('edge-threshold', 'value'),
     State('show-weights', 'value'),
-    State('network-graph', 'figure'),
+    State('view', 'data'),
+    State('year-range', 'value'),
+    State('url', 'pathname'),
     prevent_initial_call=True
 )
-def update_threshold(threshold, show_weights, current_fig):
-    filtered_edges = edges[edges['weight'] >= threshold]
-    edge_traces = update_edge_traces(filtered_edges, show_weights)
+def update_threshold(threshold, show_weights, view, years, pathname):
+    network = get_network(pathname)
+    traces = network.traces
+    edge_traces = network_edge_traces(network, threshold, 'show' in show_weights, view, years)
 
-    node_trace_hover = current_fig['data'][0]
-    node_trace = current_fig['data'][-1]
-    current_fig['data'] = [node_trace_hover] + edge_traces + [node_trace]
+    patched_fig = Patch()
+    for index, trace in enumerate(edge_traces, traces.EDGE_WEIGHTS_HOVER):
+        patched_fig['data'][index] = trace
 
-    return current_fig
+    return patched_fig
 
 @app.callback(
-    Output('network-graph', 'figure', allow_duplicate=True),
+    Output('search-results', 'options'),
+    Output('search-results', 'value'),
     Input('search-button', 'n_clicks'),
     Input('person-search', 'n_submit'),
-    State('network-graph', 'figure'),
     State('person-search', 'value'),
+    State('url', 'pathname'),
     prevent_initial_call=True
 )
-def update_search(n_clicks, n_submit, current_fig, person):
+def update_search(n_clicks, n_submit, person, pathname):
     if not person:
         raise dash.exceptions.PreventUpdate
+
+    network = get_network(pathname)
+    matches = network.search_index.search(person)
+    options = [{'label': network.data.labels[node], 'value': node} for node, _, _ in matches]
+    return options, options[0]['value'] if options else None
+
+@app.callback(
+    Output('network-graph', 'figure', allow_duplicate=True),
+    Input('search-results', 'value'),
+    State('view', 'data'),
+    State('url', 'pathname'),
+    prevent_initial_call=True
+)
+def highlight_author(node, view, pathname):
+    if node is None:
+        raise dash.exceptions.PreventUpdate
     
-    person = person.lower()
-    colors = []
-    for name in nodes['label']:
-        if person in name:
-            colors.append('red')
-        else:
-            colors.append('#b0daff')
-            
-    current_fig['data'][0]['marker']['color'] = colors
-    current_fig['data'][-1]['marker']['color'] = colors
+    network = get_network(pathname)
+    traces = network.traces
+    colors = ego_colors(network, node, view)
+
+    patched_fig = Patch()
+    patched_fig['data'][traces.NODES_HOVER]['marker']['color'] = colors
+    patched_fig['data'][traces.nodes]['marker']['color'] = colors
     
-    return current_fig
+    return patched_fig
 
 @app.callback(
     Output('network-graph', 'figure', allow_duplicate=True),
     Output('person-search', 'value'),
+    Output('search-results', 'options', allow_duplicate=True),
+    Output('search-results', 'value', allow_duplicate=True),
     Input('reset-button', 'n_clicks'),
-    State('network-graph', 'figure'),
     State('person-search', 'value'),
+    State('search-results', 'value'),
+    State('view', 'data'),
+    State('url', 'pathname'),
     prevent_initial_call=True
 )
-def update_reset(n_clicks, current_fig, person):
-    if not person:
+def update_reset(n_clicks, person, node, view, pathname):
+    if not person and node is None:
         raise dash.exceptions.PreventUpdate
 
-    current_fig['data'][0]['marker']['color'] = nodes['node_color']
-    current_fig['data'][-1]['marker']['color'] = nodes['node_color']
+    traces = get_network(pathname).traces
+    patched_fig = Patch()
+    patched_fig['data'][traces.NODES_HOVER]['marker']['color'] = traces.node_colors(view)
+    patched_fig['data'][traces.nodes]['marker']['color'] = traces.node_colors(view)
     
-    return current_fig, ''
+    return patched_fig, '', [], None
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='network', function_name='toggleWeights'),
     Output('network-graph', 'figure', allow_duplicate=True),
     Input('show-weights', 'value'),
     State('network-graph', 'figure'),
+    State('graph-meta', 'data'),
     prevent_initial_call=True
 )
-def update_weights(show_weights, current_fig):
-    if 'show' in show_weights:
-        current_fig['data'][-2]['textfont']['color'] = 'rgba(0,0,0,1)'
-    else:
-        current_fig['data'][-2]['textfont']['color'] = 'rgba(0,0,0,0)'
-
-    return current_fig
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='network', function_name='zoomLabels'),
     Output('network-graph', 'figure', allow_duplicate=True),
     Input('network-graph', 'relayoutData'),
+    Input('view', 'data'),
     State('network-graph', 'figure'),
+    State('graph-meta', 'data'),
+    prevent_initial_call=True
+)
+
+# Large networks only: the visible rectangle goes to the server, which sends the matching level of detail
+app.clientside_callback(
+    ClientsideFunction(namespace='network', function_name='viewport'),
+    Output('viewport', 'data'),
+    Input('network-graph', 'relayoutData'),
+    State('graph-meta', 'data'),
+    prevent_initial_call=True
+)
+
+@app.callback(
+    Output('network-graph', 'figure', allow_duplicate=True),
+    Output('view', 'data'),
+    Input('viewport', 'data'),
+    State('edge-threshold', 'value'),
+    State('show-weights', 'value'),
+    State('size-dropdown', 'value'),
+    State('color-by-dropdown', 'value'),
+    State('search-results', 'value'),
+    State('view', 'data'),
+    State('year-range', 'value'),
+    State('url', 'pathname'),
     prevent_initial_call=True
 )
-def update_zoom(relayout_data, current_fig):
-    if not relayout_data or not current_fig:
+def update_view(viewport, threshold, show_weights, size_attr, metric, node, current_view, years, pathname):
+    network = get_network(pathname)
+    traces = network.traces
+    view = traces.view(viewport, size_attr, years)
+    if view == current_view:
         raise dash.exceptions.PreventUpdate
 
-    global last_x_range, initial_x_range
-    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
-        cur_x0 = relayout_data['xaxis.range[0]']
-        cur_x1 = relayout_data['xaxis.range[1]']
-        new_range = cur_x1 - cur_x0
-        if new_range > 0:
-            last_x_range = new_range
-        else:
-            last_x_range = initial_x_range
+    if metric:
+        colors = metric_colors(network, metric, view, years)
+    elif node is not None:
+        colors = ego_colors(network, node, view)
     else:
-        last_x_range = initial_x_range
-
-    current_x_range = last_x_range or initial_x_range
-
-    zoom_level = initial_x_range / current_x_range
-
-    sizes = np.array(current_fig['data'][-1]['marker']['size'], dtype=float)
-    text_colors = []
-    for s in sizes:
-        if zoom_level <= 2:
-            size_factor = 0.1 + 0.9 * (s - sizes.min()) / (sizes.max() - sizes.min() + 1e-5)
-        else:
-            size_factor = 0.5 + 0.5 * (s - sizes.min()) / (sizes.max() - sizes.min() + 1e-5)
-        zoom_factor = 1 / (1 + np.exp(-3 * (zoom_level - 0.8)))
-        alpha = size_factor * zoom_factor
-        if (zoom_level == 1.0) or (alpha < 0.25) and (zoom_level < 1.5):
-            alpha = 0.0
-        alpha = min(alpha, 1.0)
-        text_colors.append(f'rgba(0,0,0,{alpha:.3f})')
-    current_fig['data'][-1]['textfont']['color'] = text_colors
-    
-    return current_fig
+        colors = traces.node_colors(view)
+
+    patched_fig = Patch()
+    edge_traces = network_edge_traces(network, threshold, 'show' in show_weights, view, years)
+    for index, trace in enumerate(edge_traces, traces.EDGE_WEIGHTS_HOVER):
+        patched_fig['data'][index] = trace
+    # Node traces are updated property by property to keep the colour scale
+    node_trace_hover, node_trace = network_node_traces(network, size_attr, view, years)
+    for index, trace in ((traces.NODES_HOVER, node_trace_hover), (traces.nodes, node_trace)):
+        patched_fig['data'][index]['x'] = trace.x
+        patched_fig['data'][index]['y'] = trace.y
+        patched_fig['data'][index]['hovertext'] = trace.hovertext
+        patched_fig['data'][index]['marker']['color'] = colors
+    patched_fig['data'][traces.nodes]['text'] = node_trace.text
+    patched_fig['data'][traces.nodes]['marker']['size'] = node_trace.marker.size
+    patched_fig['data'][traces.nodes]['textfont']['size'] = node_trace.textfont.size
+
+    return patched_fig, view
+
+@app.callback(
+    Output('network-graph', 'figure', allow_duplicate=True),
+    Input('year-range', 'value'),
+    State('edge-threshold', 'value'),
+    State('show-weights', 'value'),
+    State('size-dropdown', 'value'),
+    State('color-by-dropdown', 'value'),
+    State('view', 'data'),
+    State('url', 'pathname'),
+    prevent_initial_call=True
+)
+def update_years(years, threshold, show_weights, size_attr, metric, view, pathname):
+    if years is None or size_attr is None:
+        raise dash.exceptions.PreventUpdate
+
+    network = get_network(pathname)
+    traces = network.traces
+    # Links and metrics of the years are differences of the cumulative per-year arrays
+    patched_fig = Patch()
+    edge_traces = network_edge_traces(network, threshold, 'show' in show_weights, view, years)
+    for index, trace in enumerate(edge_traces, traces.EDGE_WEIGHTS_HOVER):
+        patched_fig['data'][index] = trace
+    sizes, font_size = node_sizes(network, size_attr, view, years)
+    patched_fig['data'][traces.nodes]['marker']['size'] = sizes.tolist()
+    patched_fig['data'][traces.nodes]['textfont']['size'] = font_size.tolist()
+    if metric:
+        patched_fig['data'][traces.nodes]['marker']['color'] = metric_colors(network, metric, view, years)
+
+    return patched_fig
 
 @app.callback(
     Output('network-graph', 'figure', allow_duplicate=True), 
@@ -567,21 +512,21 @@ def update_zoom(relayout_data, current_fig):
     Output('color-thresholds-container', 'style'),
     Output('color-by-dropdown', 'value'),
     Input('color-button', 'n_clicks'),
-    State('network-graph', 'figure'),
+    State('view', 'data'),
+    State('url', 'pathname'),
     prevent_initial_call=True
 )
-def toggle_color_dropdown(n_clicks, current_fig):
+def toggle_color_dropdown(n_clicks, view, pathname):
     if n_clicks % 2 == 1:
-        return current_fig, {'display': 'block'}, {'display': 'flex'}, ''
-    trace = current_fig['data'][-1]['marker']
-    trace['color'] = nodes['node_color']
-    trace.pop('colorscale', None)
-    trace.pop('colorbar', None)
-    trace.pop('showscale', None)
-    trace.pop('cmin', None)
-    trace.pop('cmax', None)
+        return dash.no_update, {'display': 'block'}, {'display': 'flex'}, ''
+
+    traces = get_network(pathname).traces
+    patched_fig = Patch()
+    marker = patched_fig['data'][traces.nodes]['marker']
+    marker['color'] = traces.node_colors(view)
+    marker['showscale'] = False
     
-    return current_fig, {'display': 'none'}, {'display': 'none'}, ''
+    return patched_fig, {'display': 'none'}, {'display': 'none'}, ''
 
 @app.callback(
     Output('network-graph', 'figure', allow_duplicate=True),
@@ -589,25 +534,30 @@ def toggle_color_dropdown(n_clicks, current_fig):
     Output('node-color-max', 'value'),
     Output('node-color-limits', 'data'),
     Input('color-by-dropdown', 'value'),
-    State('network-graph', 'figure'),
+    State('view', 'data'),
+    State('year-range', 'value'),
+    State('url', 'pathname'),
     prevent_initial_call=True
 )
-def update_node_colors(metric, current_fig):
+def update_node_colors(metric, view, years, pathname):
     if not metric:
         raise dash.exceptions.PreventUpdate
 
-    values = nodes[metric]
-    colorbar_title = options_label[metric]
-
-    vmin = float(np.floor(np.min(values)))
-    vmax = float(np.ceil(np.max(values)))
-
-    node_trace = current_fig['data'][-1]['marker']
-    node_trace['color'] = values
-    node_trace['colorscale'] = 'Viridis'
-    node_trace['cmin'] = vmin
-    node_trace['cmax'] = vmax
-    node_trace['colorbar'] = {
+    network = get_network(pathname)
+    traces = network.traces
+    values = network.data.window_nodes(years)[metric]
+    colorbar_title = COLOR_LABELS[metric]
+
+    vmin = float(np.floor(np.nanmin(values)))
+    vmax = float(np.ceil(np.nanmax(values)))
+
+    patched_fig = Patch()
+    marker = patched_fig['data'][traces.nodes]['marker']
+    marker['color'] = metric_colors(network, metric, view, years)
+    marker['colorscale'] = 'Viridis'
+    marker['cmin'] = vmin
+    marker['cmax'] = vmax
+    marker['colorbar'] = {
         'title': colorbar_title,
         'titleside': 'top',
         'orientation': 'h',
@@ -617,14 +567,13 @@ def update_node_colors(metric, current_fig):
         'yanchor': 'bottom',
         'len': 0.4,
         'thickness': 14,
-        'xanchor': 'left',
         'tickfont': dict(size=12),
         'titlefont': dict(size=15),
         'bgcolor': '#fff'
     }
-    node_trace['showscale'] = True
+    marker['showscale'] = True
 
-    return current_fig, vmin, vmax, {'vmin': vmin, 'vmax': vmax}
+    return patched_fig, vmin, vmax, {'vmin': vmin, 'vmax': vmax}
 
 @app.callback(
     Output('network-graph', 'figure', allow_duplicate=True),
@@ -632,32 +581,28 @@ def update_node_colors(metric, current_fig):
     Input('node-color-max', 'value'),
     State('color-by-dropdown', 'value'),
     State('node-color-limits', 'data'),
-    State('network-graph', 'figure'),
+    State('url', 'pathname'),
     prevent_initial_call=True
 )
-def update_node_colors_thresholds(scale_min, scale_max, metric, limits, current_fig):
+def update_node_colors_thresholds(scale_min, scale_max, metric, limits, pathname):
     if metric is None or limits is None:
         raise dash.exceptions.PreventUpdate
     if scale_min is None or scale_max is None:
         raise dash.exceptions.PreventUpdate
 
+    traces = get_network(pathname).traces
     vmin = limits['vmin']
     vmax = limits['vmax']
 
-    scale_min = max(scale_min, vmin)
-    scale_max = min(scale_max, vmax)
-
-    values = nodes[metric]
-    clipped = np.clip(values, scale_min, scale_max)
-
-    trace = current_fig['data'][-1]['marker']
-    trace['color'] = values
-    trace['cmin'] = scale_min
-    trace['cmax'] = scale_max
+    patched_fig = Patch()
+    marker = patched_fig['data'][traces.nodes]['marker']
+    marker['cmin'] = max(scale_min, vmin)
+    marker['cmax'] = min(scale_max, vmax)
 
-    return current_fig
+    return patched_fig
 
 
 # START
 if __name__ == '__main__':
+    setup_logging()
     app.run()
@@ -0,0 +1,80 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    network: {
+        // Label opacity grows with the zoom level and the node size,
+        // recomputed as well when the server sends another level of detail
+        zoomLabels: function (relayoutData, view, figure, meta) {
+            if (!relayoutData || !figure || !meta) {
+                return window.dash_clientside.no_update;
+            }
+
+            let currentRange = meta.x_range;
+            const x0 = relayoutData['xaxis.range[0]'];
+            const x1 = relayoutData['xaxis.range[1]'];
+            if (x0 !== undefined && x1 !== undefined && x1 - x0 > 0) {
+                currentRange = x1 - x0;
+            }
+            const zoomLevel = meta.x_range / currentRange;
+
+            const nodeTrace = figure.data[meta.nodes];
+            const sizes = Array.from(nodeTrace.marker.size);
+            let minSize = Infinity, maxSize = -Infinity;
+            for (const size of sizes) {
+                minSize = Math.min(minSize, size);
+                maxSize = Math.max(maxSize, size);
+            }
+            const span = maxSize - minSize + 1e-5;
+            const base = zoomLevel <= 2 ? 0.1 : 0.5;
+            const zoomFactor = 1 / (1 + Math.exp(-3 * (zoomLevel - 0.8)));
+            const colors = sizes.map(function (size) {
+                let alpha = (base + (1 - base) * (size - minSize) / span) * zoomFactor;
+                if (zoomLevel === 1.0 || (alpha < 0.25 && zoomLevel < 1.5)) {
+                    alpha = 0.0;
+                }
+                return 'rgba(0,0,0,' + Math.min(alpha, 1.0).toFixed(3) + ')';
+            });
+
+            return window.dash_clientside.network.restyle(figure, meta.nodes, 'textfont', {color: colors});
+        },
+
+        toggleWeights: function (showWeights, figure, meta) {
+            if (!figure || !meta) {
+                return window.dash_clientside.no_update;
+            }
+            const color = showWeights && showWeights.includes('show') ? 'rgba(0,0,0,1)' : 'rgba(0,0,0,0)';
+            return window.dash_clientside.network.restyle(figure, meta.edge_weights, 'textfont', {color: color});
+        },
+
+        // Visible rectangle of a large network, null for the whole plot
+        viewport: function (relayoutData, meta) {
+            if (!relayoutData || !meta || !meta.lod) {
+                return window.dash_clientside.no_update;
+            }
+            if (relayoutData['xaxis.autorange']) {
+                return null;
+            }
+            const x = relayoutData['xaxis.range'] ||
+                [relayoutData['xaxis.range[0]'], relayoutData['xaxis.range[1]']];
+            const y = relayoutData['yaxis.range'] ||
+                [relayoutData['yaxis.range[0]'], relayoutData['yaxis.range[1]']];
+            if (x[0] === undefined || x[1] === undefined) {
+                return window.dash_clientside.no_update;
+            }
+            const viewport = {x0: x[0], x1: x[1]};
+            if (y[0] !== undefined && y[1] !== undefined) {
+                viewport.y0 = y[0];
+                viewport.y1 = y[1];
+            }
+            return viewport;
+        },
+
+        // Copy of the figure with new values of one attribute of one trace,
+        // the layout object is kept so the current zoom stays
+        restyle: function (figure, index, attribute, values) {
+            const data = figure.data.slice();
+            const trace = Object.assign({}, data[index]);
+            trace[attribute] = Object.assign({}, trace[attribute], values);
+            data[index] = trace;
+            return Object.assign({}, figure, {data: data});
+        }
+    }
+});
@@ -0,0 +1,99 @@
+""" Import time of the package and the scripts
+
+Imports every module in a fresh interpreter several times and reports the
+median and minimal wall time, the heavy dependencies the import loaded and
+whether it configured logging:
+
+    python -m benchmarks.import_benchmark --repeat 5
+    python -m benchmarks.import_benchmark main elibrary_parser.downloader --top 10
+
+--top lists the slowest imports of every module by cumulative time, as
+measured by python -X importtime.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    'elibrary_parser',
+    'elibrary_parser.html_parser',
+    'elibrary_parser.serializer',
+    'elibrary_parser.downloader',
+    'elibrary_parser.network',
+    'elibrary_parser.thesaurus',
+    'main',
+    'build_network',
+    'surname_compare',
+]
+HEAVY_PACKAGES = ['selenium', 'bs4', 'numpy', 'pandas', 'scipy', 'sklearn', 'plotly', 'dash']
+
+PROBE = '''
+import json, logging, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': seconds,
+    'loaded': [name for name in {packages!r} if name in sys.modules],
+    'logging configured': bool(logging.getLogger().handlers),
+}}))
+'''
+
+
+def probe(module) -> dict:
+    code = PROBE.format(module=module, packages=HEAVY_PACKAGES)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def slowest_imports(module, top) -> list:
+    """ (cumulative seconds, module) of the slowest imports in the -X importtime report """
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.removeprefix('import time:').split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        imports.append((int(fields[1]) / 1e6, fields[2].strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of the package modules and scripts')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=0, help='slowest imports to list for every module')
+    args = parser.parse_args()
+
+    rows = []
+    for module in args.modules:
+        probes = [probe(module) for _ in range(args.repeat)]
+        seconds = [result['seconds'] for result in probes]
+        rows.append({
+            'module': module,
+            'median, s': statistics.median(seconds),
+            'min, s': min(seconds),
+            'loaded': ', '.join(probes[-1]['loaded']) or '-',
+            'logging': 'configured' if probes[-1]['logging configured'] else '-',
+        })
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda value: f'{value:.3f}'))
+
+    for module in args.modules if args.top else []:
+        print(f'\nSlowest imports of {module}:')
+        for seconds, name in slowest_imports(module, args.top):
+            print(f'{seconds:8.3f} s  {name}')
+
+
+if __name__ == '__main__':
+    main()
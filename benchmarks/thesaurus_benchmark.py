@@ -0,0 +1,229 @@
+""" Quality and speed of the author thesaurus
+
+Runs ThesaurusBuilder on a hand-labeled set of name pairs and on synthetic
+authors with known identities, and reports precision, recall, runtime and
+peak memory for every parameter combination. The runtime comes from an
+untraced run and the peak memory from a second run under tracemalloc,
+which slows Python code down several times. tracemalloc only sees this
+process; with --n-jobs above 1 the peak resident memory of the largest
+worker process so far is reported as well (getrusage of the children):
+
+    python -m benchmarks.thesaurus_benchmark --authors 20000 --similarity-coefficient 0.75 0.8 0.85
+"""
+import argparse
+import itertools
+import logging
+import resource
+import time
+import tracemalloc
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from elibrary_parser.authors import AuthorNameNormalizer, to_latin
+from elibrary_parser.thesaurus import ThesaurusBuilder
+
+LABELED_PAIRS = Path(__file__).with_name('labeled_pairs.tsv')
+
+SURNAMES = [
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов', 'Новиков',
+    'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров', 'Павлов', 'Козлов',
+    'Степанов', 'Николаев', 'Орлов', 'Андреев', 'Макаров', 'Никитин', 'Захаров', 'Зайцев', 'Соловьев',
+    'Борисов', 'Яковлев', 'Григорьев', 'Романов', 'Воробьев', 'Сергеев', 'Кузьмин', 'Фролов', 'Александров',
+    'Дмитриев', 'Королев', 'Гусев', 'Киселев', 'Ильин', 'Максимов', 'Поляков', 'Сорокин', 'Виноградов',
+    'Ковалев', 'Белов', 'Медведев', 'Антонов', 'Тарасов', 'Жуков', 'Баранов', 'Филиппов', 'Комаров',
+    'Давыдов', 'Беляев', 'Герасимов', 'Богданов', 'Осипов', 'Сидоров', 'Матвеев', 'Титов', 'Марков',
+    'Миронов', 'Крылов', 'Куликов', 'Карпов', 'Власов', 'Мельников', 'Денисов', 'Гаврилов', 'Тихонов',
+    'Казаков', 'Афанасьев', 'Данилов', 'Савельев', 'Тимофеев', 'Фомин', 'Чернов', 'Абрамов', 'Мартынов',
+    'Ефимов', 'Федотов', 'Щербаков', 'Назаров', 'Калинин', 'Исаев', 'Чернышев', 'Быков', 'Маслов',
+    'Родионов', 'Коновалов', 'Лазарев', 'Воронин', 'Климов', 'Филатов', 'Пономарев', 'Голубев', 'Кудрявцев',
+    'Прохоров', 'Наумов', 'Потапов', 'Журавлев', 'Овчинников', 'Трофимов', 'Леонов', 'Соболев', 'Ермаков',
+    'Колесников', 'Гончаров', 'Емельянов', 'Никифоров', 'Грачев', 'Котов', 'Гришин', 'Ефремов', 'Архипов',
+    'Громов', 'Кириллов', 'Малышев', 'Панов', 'Моисеев', 'Румянцев', 'Акимов', 'Кондратьев', 'Бирюков',
+    'Горбунов', 'Анисимов', 'Еремин', 'Тихомиров', 'Галкин', 'Лукьянов', 'Михеев', 'Скворцов', 'Юдин',
+    'Белоусов', 'Нестеров', 'Симонов', 'Прокофьев', 'Харитонов', 'Князев', 'Цветков', 'Левин', 'Митрофанов',
+    'Воронов', 'Аксенов', 'Софронов', 'Мальцев', 'Логинов', 'Горшков', 'Савин', 'Краснов', 'Майоров',
+    'Демидов', 'Елисеев', 'Рыбаков', 'Сафонов', 'Плотников', 'Демин', 'Хохлов', 'Жданов', 'Носов',
+    'Островский', 'Вишневский', 'Ковальский', 'Залесский', 'Покровский', 'Успенский', 'Троицкий',
+]
+INITIALS = 'АБВГДЕИКЛМНОПРСТФЮЯ'
+CYRILLIC = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+
+
+class NameVariantGenerator:
+    """ Synthetic authors and the spellings their names take in publications
+
+    Every author has a surname (the female form for about a third of them)
+    and two initials. Besides the canonical 'Иванов И.И.' an author may be
+    spelled with a typo in the surname, transliterated to latin, with the
+    second initial missing, or with a space between the initials. Authors
+    share surnames, so the set also contains different people with close
+    names, e.g. namesakes with other initials and husband and wife.
+
+     Attributes
+     ----------
+     variant_rate: float
+        expected number of extra spellings per author
+    """
+
+    def __init__(self, variant_rate=0.5, seed=0):
+        self.variant_rate = variant_rate
+        self.rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def female(surname: str) -> str:
+        if surname.endswith('ий'):
+            return surname[:-2] + 'ая'
+        return surname + 'а'
+
+    def typo(self, surname: str) -> str:
+        position = int(self.rng.integers(1, len(surname)))
+        letter = str(self.rng.choice(list(CYRILLIC)))
+        kind = self.rng.integers(3)
+        if kind == 0:
+            return surname[:position] + letter + surname[position + 1:]
+        if kind == 1:
+            return surname[:position] + surname[position + 1:]
+        return surname[:position] + surname[position] + surname[position:]
+
+    def variant(self, surname: str, first: str, second: str) -> str:
+        kind = self.rng.integers(4)
+        if kind == 0:
+            return f'{self.typo(surname)} {first}.{second}.'
+        if kind == 1:
+            return to_latin(f'{surname} {first}.{second}.')
+        if kind == 2:
+            return f'{surname} {first}.'
+        return f'{surname} {first}. {second}.'
+
+    def generate(self, n_authors: int) -> pd.DataFrame:
+        """ DataFrame with 'Authors', 'Count' and the true 'Person' of every spelling """
+
+        rows = {}
+        for person in range(n_authors):
+            surname = str(self.rng.choice(SURNAMES))
+            if self.rng.random() < 1 / 3:
+                surname = self.female(surname)
+            first, second = self.rng.choice(list(INITIALS), size=2)
+            spellings = [f'{surname} {first}.{second}.']
+            spellings += [self.variant(surname, first, second) for _ in range(self.rng.poisson(self.variant_rate))]
+            for name in spellings:
+                # A spelling taken by another person is ambiguous and left to its first owner
+                if name not in rows:
+                    rows[name] = (person, int(self.rng.geometric(0.3)))
+        return pd.DataFrame(
+            [(name, count, person) for name, (person, count) in rows.items()],
+            columns=['Authors', 'Count', 'Person'],
+        )
+
+
+def pair_count(sizes) -> int:
+    sizes = np.asarray(sizes, dtype=np.int64)
+    return int((sizes * (sizes - 1) // 2).sum())
+
+
+def clustering_scores(predicted, truth) -> dict:
+    """ Pairwise precision and recall of a clustering against the true one """
+
+    predicted = pd.factorize(pd.Series(predicted))[0]
+    truth = pd.factorize(pd.Series(truth))[0]
+    both = pd.DataFrame({'predicted': predicted, 'truth': truth}).value_counts().to_numpy()
+    true_positive = pair_count(both)
+    predicted_pairs = pair_count(np.bincount(predicted))
+    true_pairs = pair_count(np.bincount(truth))
+    return {
+        'precision': true_positive / predicted_pairs if predicted_pairs else 1.0,
+        'recall': true_positive / true_pairs if true_pairs else 1.0,
+    }
+
+
+def run_builder(builder, authors) -> tuple:
+    """ Thesaurus for the authors, its untraced runtime and the peak traced memory of a second run """
+
+    normalized = AuthorNameNormalizer().normalize(authors['Authors'])
+    args = authors['Authors'], normalized['Surnames'], normalized['Initials'], authors['Count']
+    start = time.perf_counter()
+    thesaurus = builder.build(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    builder.build(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return thesaurus, elapsed, peak
+
+
+def worker_peak() -> float:
+    """ Peak resident memory of the largest finished child process so far, MB (kilobytes on Linux) """
+
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 2 ** 10
+
+
+def evaluate_synthetic(builder, authors) -> dict:
+    thesaurus, elapsed, peak = run_builder(builder, authors)
+    predicted = authors['Authors'].map(lambda name: thesaurus.get(name, name))
+    return {'names': len(authors), **clustering_scores(predicted, authors['Person']),
+            'time, s': elapsed, 'peak, MB': peak / 2 ** 20}
+
+
+def evaluate_labeled(builder, pairs) -> dict:
+    names = pd.unique(pd.concat([pairs['Name 1'], pairs['Name 2']], ignore_index=True))
+    authors = pd.DataFrame({'Authors': names, 'Count': 1})
+    thesaurus, elapsed, peak = run_builder(builder, authors)
+    canonical = {name: thesaurus.get(name, name) for name in names}
+    predicted = pairs['Name 1'].map(canonical) == pairs['Name 2'].map(canonical)
+    same = pairs['Same'].astype(bool)
+    true_positive = (predicted & same).sum()
+    return {
+        'names': len(names),
+        'precision': true_positive / predicted.sum() if predicted.sum() else 1.0,
+        'recall': true_positive / same.sum() if same.sum() else 1.0,
+        'time, s': elapsed,
+        'peak, MB': peak / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precision, recall, runtime and memory of the author thesaurus')
+    parser.add_argument('--authors', type=int, default=20000, help='number of synthetic authors')
+    parser.add_argument('--variant-rate', type=float, default=0.5, help='extra spellings per synthetic author')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--similarity-coefficient', type=float, nargs='+', default=[0.8])
+    parser.add_argument('--surname-diff', type=int, nargs='+', default=[3])
+    parser.add_argument('--ngram-range', nargs='+', default=['1,2'], help='e.g. 1,2 2,3')
+    parser.add_argument('--check-gender', choices=['yes', 'no'], nargs='+', default=['yes'])
+    parser.add_argument('--n-jobs', type=int, default=1)
+    args = parser.parse_args()
+    # Progress messages of the builder would bury the report
+    logging.getLogger('elibrary_parser').setLevel(logging.WARNING)
+
+    labeled = pd.read_csv(LABELED_PAIRS, sep='\t')
+    synthetic = NameVariantGenerator(variant_rate=args.variant_rate, seed=args.seed).generate(args.authors)
+
+    rows = []
+    for similarity, diff, ngram_range, check_gender in itertools.product(
+            args.similarity_coefficient, args.surname_diff, args.ngram_range, args.check_gender):
+        builder = ThesaurusBuilder(
+            similarity_coefficient=similarity,
+            surname_diff=diff,
+            ngram_range=tuple(int(value) for value in ngram_range.split(',')),
+            check_gender=check_gender == 'yes',
+            n_jobs=args.n_jobs,
+        )
+        params = {'similarity': similarity, 'surname diff': diff, 'ngrams': ngram_range, 'gender': check_gender}
+        for name, evaluate, data in [('labeled', evaluate_labeled, labeled), ('synthetic', evaluate_synthetic, synthetic)]:
+            row = {**params, 'set': name, **evaluate(builder, data)}
+            if args.n_jobs > 1:
+                # A high-water mark over all runs so far, not the peak of this run
+                row['workers peak so far, MB'] = worker_peak()
+            rows.append(row)
+
+    report = pd.DataFrame(rows)
+    report['f1'] = 2 * report['precision'] * report['recall'] / (report['precision'] + report['recall'])
+    print(report.to_string(index=False, float_format=lambda value: f'{value:.3f}'))
+
+
+if __name__ == '__main__':
+    main()
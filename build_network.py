@@ -0,0 +1,47 @@
+import argparse
+import logging
+
+from elibrary_parser.author_metrics import AuthorMetrics
+from elibrary_parser.layout import ForceLayout
+from elibrary_parser.network import CoauthorshipNetworkBuilder
+from elibrary_parser.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build map.txt and network.txt from publications.csv')
+    parser.add_argument('org_id', help='ID of the educational institution')
+    parser.add_argument('--data-path', default='org_data/')
+    parser.add_argument('--min-documents', type=int, default=1)
+    parser.add_argument('--max-authors', type=int, default=25)
+    parser.add_argument('--resolution', type=float, default=1.0)
+    parser.add_argument('--iterations', type=int, default=150, help='layout iterations from scratch')
+    parser.add_argument('--warm-iterations', type=int, default=30, help='layout iterations from previous map.txt')
+    parser.add_argument('--cold-start', action='store_true', help='ignore coordinates of the existing map.txt')
+    parser.add_argument('--field-normalization', action='store_true',
+                        help='normalize citations by source and year instead of year only')
+    parser.add_argument('--metrics-only', action='store_true',
+                        help='only refresh the metric columns of the existing map.txt')
+    args = parser.parse_args()
+    setup_logging()
+
+    builder = CoauthorshipNetworkBuilder(
+        org_id=args.org_id,
+        data_path=args.data_path,
+        min_documents=args.min_documents,
+        max_authors=args.max_authors,
+        resolution=args.resolution,
+        layout=ForceLayout(iterations=args.iterations, warm_iterations=args.warm_iterations),
+        warm_start=not args.cold_start,
+        metrics=AuthorMetrics(normalize_by=('Source ID', 'Year') if args.field_normalization else ('Year',))
+    )
+    if args.metrics_only:
+        builder.refresh_metrics()
+        return
+    nodes, edges = builder.build()
+    builder.save(nodes, edges)
+
+
+if __name__ == '__main__':
+    main()
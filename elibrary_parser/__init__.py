@@ -1,7 +1,37 @@
-from .types import Publication
-from .downloader import Downloader
-from .html_parser import ElibraryHTMLParser
-from .serializer import PublicationSerializer
-from .utils import find_common_publications
-from . import config
-from . import logging_config
+""" Download, parse and analyse eLibrary publications of organizations
+
+Names are imported on first use (PEP 562), so e.g. a parse-only script
+does not load Selenium through Downloader:
+
+    from elibrary_parser import ElibraryHTMLParser
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    'Publication': '.types',
+    'Downloader': '.downloader',
+    'ElibraryHTMLParser': '.html_parser',
+    'PublicationSerializer': '.serializer',
+    'PublicationOverlap': '.overlap',
+    'find_common_publications': '.utils',
+}
+_LAZY_MODULES = {'config', 'logging_config'}
+
+__all__ = [*_LAZY_ATTRIBUTES, *sorted(_LAZY_MODULES)]
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    elif name in _LAZY_MODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Later lookups find the attribute without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
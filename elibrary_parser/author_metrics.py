@@ -0,0 +1,85 @@
+import logging
+
+import pandas as pd
+
+
+class AuthorMetrics:
+    """ Per-author bibliometric indicators in VOSviewer map.txt terms
+
+    The normalized citation count of a publication is its number of citations
+    divided by the average number of citations of the publications in the same
+    normalization group. By default the group is the publication year, as in
+    VOSviewer; adding 'Source ID' normalizes by field (journal) and year.
+
+     Attributes
+     ----------
+     normalize_by: tuple
+        publications.csv columns that define the normalization groups
+    """
+
+    logger = logging.getLogger(__name__)
+
+    MAP_COLUMNS = [
+        'weight<Documents>', 'weight<Citations>', 'weight<Norm. citations>',
+        'score<Avg. pub. year>', 'score<Avg. citations>', 'score<Avg. norm. citations>',
+    ]
+
+    def __init__(self, normalize_by=('Year',)):
+        self.normalize_by = list(normalize_by)
+
+    def publication_table(self, publications) -> pd.DataFrame:
+        """ Year, citations and normalized citations of every publication """
+
+        table = pd.DataFrame({
+            'year': pd.to_numeric(publications['Year'], errors='coerce'),
+            'citations': pd.to_numeric(publications['Cited by'], errors='coerce').fillna(0),
+        }, index=publications.index)
+        groups = [publications[column] for column in self.normalize_by]
+        mean_citations = table.groupby(groups, dropna=False)['citations'].transform('mean')
+        table['norm_citations'] = (table['citations'] / mean_citations.where(mean_citations > 0)).fillna(0)
+        return table
+
+    def compute(self, authorship, publications) -> pd.DataFrame:
+        """ Metrics for every author in one grouped pass
+
+        :param authorship: (publication, author) pairs, publication is the publications index
+        :param publications: publications.csv table
+        :return: DataFrame indexed by author with MAP_COLUMNS and 'h-index'
+        """
+
+        mentions = authorship.join(self.publication_table(publications), on='publication')
+        mentions = mentions.sort_values(['author', 'citations'], ascending=[True, False])
+        # Citations sorted in descending order satisfy c >= rank exactly for the first h publications
+        rank = mentions.groupby('author').cumcount() + 1
+        mentions['in_h_core'] = mentions['citations'] >= rank
+
+        grouped = mentions.groupby('author').agg(
+            documents=('publication', 'size'),
+            citations=('citations', 'sum'),
+            norm_citations=('norm_citations', 'sum'),
+            avg_year=('year', 'mean'),
+            avg_citations=('citations', 'mean'),
+            avg_norm_citations=('norm_citations', 'mean'),
+            h_index=('in_h_core', 'sum'),
+        )
+        metrics = pd.DataFrame({
+            'weight<Documents>': grouped['documents'],
+            'weight<Citations>': grouped['citations'].astype(int),
+            'weight<Norm. citations>': grouped['norm_citations'].round(4),
+            'score<Avg. pub. year>': grouped['avg_year'].round(4),
+            'score<Avg. citations>': grouped['avg_citations'].round(4),
+            'score<Avg. norm. citations>': grouped['avg_norm_citations'].round(4),
+            'h-index': grouped['h_index'].astype(int),
+        })
+        self.logger.info(f"Computed metrics for {len(metrics)} authors from {len(mentions)} authorships")
+        return metrics
+
+    def yearly_output(self, authorship, publications) -> pd.DataFrame:
+        """ Number of publications of every author per year """
+
+        years = self.publication_table(publications)['year']
+        mentions = authorship.assign(year=years.reindex(authorship['publication']).to_numpy())
+        mentions = mentions.dropna(subset=['year']).astype({'year': int})
+        counts = mentions.groupby(['author', 'year']).size().unstack(fill_value=0)
+        counts.columns = [f'documents<{year}>' for year in counts.columns]
+        return counts
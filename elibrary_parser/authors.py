@@ -0,0 +1,114 @@
+import csv
+import re
+
+from pathlib import Path
+
+import pandas as pd
+
+# Same result as transliterate's translit(text, 'ru', reversed=True), one character at a time
+CYRILLIC_TO_LATIN = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'j', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
+    'ъ': "'", 'ы': 'y', 'ь': "'", 'э': 'e', 'ю': 'ju', 'я': 'ja',
+    'А': 'A', 'Б': 'B', 'В': 'V', 'Г': 'G', 'Д': 'D', 'Е': 'E', 'Ё': 'E', 'Ж': 'Zh', 'З': 'Z',
+    'И': 'I', 'Й': 'J', 'К': 'K', 'Л': 'L', 'М': 'M', 'Н': 'N', 'О': 'O', 'П': 'P', 'Р': 'R',
+    'С': 'S', 'Т': 'T', 'У': 'U', 'Ф': 'F', 'Х': 'H', 'Ц': 'Ts', 'Ч': 'Ch', 'Ш': 'Sh', 'Щ': 'Sch',
+    'Ъ': "'", 'Ы': 'Y', 'Ь': "'", 'Э': 'E', 'Ю': 'Ju', 'Я': 'Ja',
+})
+
+LATIN_TO_CYRILLIC = {
+    'sch': 'щ', 'zh': 'ж', 'ts': 'ц', 'ch': 'ч', 'sh': 'ш', 'ju': 'ю', 'ja': 'я', 'yu': 'ю', 'ya': 'я',
+    'kh': 'х', 'a': 'а', 'b': 'б', 'v': 'в', 'g': 'г', 'd': 'д', 'e': 'е', 'z': 'з', 'i': 'и',
+    'j': 'й', 'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п', 'r': 'р', 's': 'с',
+    't': 'т', 'u': 'у', 'f': 'ф', 'h': 'х', 'c': 'ц', 'y': 'ы', 'w': 'в', 'x': 'кс', 'q': 'к',
+}
+_LATIN_PATTERN = re.compile('|'.join(sorted(LATIN_TO_CYRILLIC, key=len, reverse=True)))
+
+
+def to_latin(text: str) -> str:
+    return text.translate(CYRILLIC_TO_LATIN)
+
+
+def to_cyrillic(text: str) -> str:
+    """ Best-effort reverse transliteration of a lowercase latin text """
+
+    return _LATIN_PATTERN.sub(lambda match: LATIN_TO_CYRILLIC[match.group(0)], text)
+
+
+def load_thesaurus(path) -> dict:
+    """ Read a thesaurus file with 'Label' and 'Replace by' columns
+
+    :param path: path to thesaurus_authors.txt
+    :return: {author spelling: canonical spelling}, empty if the file is missing
+    """
+
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+        next(reader, None)
+        return {row[0]: row[1] for row in reader if len(row) >= 2}
+
+
+def author_mentions(authors: pd.Series, replace_dict: dict) -> pd.DataFrame:
+    """ One row per author mention with the thesaurus form of the name
+
+    :param authors: 'Authors' column of publications.csv
+    :param replace_dict: thesaurus {author spelling: canonical spelling}
+    :return: DataFrame with the publication index and the lowercase author
+    """
+
+    names = (
+        authors.dropna()
+        .str.split(';')
+        .explode()
+        .str.replace('et al.', '', regex=False)
+        .str.strip()
+    )
+    names = names[names != '']
+    # The thesaurus lookup runs once per distinct spelling
+    codes, uniques = pd.factorize(names)
+    canonical = pd.Index([replace_dict.get(name, name) for name in uniques]).str.lower()
+    return pd.DataFrame({
+        'publication': names.index.to_numpy(),
+        'author': canonical.to_numpy()[codes],
+    })
+
+
+class AuthorNameNormalizer:
+    """ Transliterated surname and initials of author names
+
+    'Иванов И.И.' becomes surname 'ivanov' and initials 'i.i'. Every distinct
+    spelling is normalized once with vectorized string operations and kept in
+    a cache, repeated names are served from it.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def _normalize_new(self, names: pd.Series):
+        ready = names.str.lower().str.replace(r'[^а-яa-zё .]', '', regex=True)
+        ready = ready.str.replace(r'\.$', '', regex=True)
+        parts = ready.str.extract(r'^\s*(\S*)\s*(.*)$')
+        surnames = parts[0].fillna('').str.translate(CYRILLIC_TO_LATIN)
+        initials = parts[1].fillna('').str.replace(r'\s+', '', regex=True).str.translate(CYRILLIC_TO_LATIN)
+        self._cache.update(zip(names, zip(surnames, initials)))
+
+    def normalize(self, names) -> pd.DataFrame:
+        """ DataFrame with 'Surnames' and 'Initials' aligned with the given names """
+
+        names = pd.Series(names)
+        codes, uniques = pd.factorize(names)
+        cache = self._cache
+        new = [name for name in uniques if name not in cache]
+        if new:
+            self._normalize_new(pd.Series(new, dtype=object))
+        normalized = [cache[name] for name in uniques]
+        surnames = pd.Index([surname for surname, _ in normalized], dtype=object)
+        initials = pd.Index([initial for _, initial in normalized], dtype=object)
+        return pd.DataFrame({
+            'Surnames': surnames.to_numpy()[codes],
+            'Initials': initials.to_numpy()[codes],
+        }, index=names.index)
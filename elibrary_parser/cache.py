@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+
+class ResultCache(ABC):
+    """ Memoized results of expensive computations with LRU eviction
+
+    A result is stored under the hash of its key parts, e.g. (org id, data
+    version, computation name, parameters), so a new version of the data
+    never hits the results of the old one. Subclasses implement the storage.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def key(*parts) -> str:
+        text = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @abstractmethod
+    def load(self, key):
+        """ Stored result, KeyError if there is none """
+
+    @abstractmethod
+    def store(self, key, value):
+        pass
+
+    def memoize(self, parts, compute):
+        """ Result for the key parts, computed by compute() on a miss """
+
+        key = self.key(*parts)
+        try:
+            return self.load(key)
+        except KeyError:
+            pass
+        value = compute()
+        self.store(key, value)
+        return value
+
+
+class MemoryCache(ResultCache):
+    """ Results in a dict of the current process
+
+     Attributes
+     ----------
+     maxsize: int
+        maximal number of results, the least recently used are evicted
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        with self._lock:
+            value = self._results[key]
+            self._results.move_to_end(key)
+            return value
+
+    def store(self, key, value):
+        with self._lock:
+            self._results[key] = value
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+
+class FileSystemCache(ResultCache):
+    """ Results pickled to files of a directory shared by worker processes
+
+    A file is written under a temporary name and renamed, so other processes
+    never read a half-written result. The modification time of a file is its
+    last use: reads touch it and eviction removes the oldest files.
+
+     Attributes
+     ----------
+     directory: Path
+        directory with the <key>.pkl files
+     maxsize: int
+        maximal number of results, the least recently used are evicted
+    """
+
+    def __init__(self, directory, maxsize=512):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.maxsize = maxsize
+
+    def path(self, key) -> Path:
+        return self.directory / f'{key}.pkl'
+
+    def load(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+            os.utime(path)
+        except FileNotFoundError:
+            raise KeyError(key)
+        except (EOFError, pickle.UnpicklingError, OSError) as e:
+            self.logger.warning(f"Unreadable cached result {path}: {e}")
+            raise KeyError(key)
+        return value
+
+    def store(self, key, value):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        files = []
+        for path in self.directory.glob('*.pkl'):
+            try:
+                files.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+        if len(files) <= self.maxsize:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.maxsize]:
+            # Another worker may be evicting the same file
+            path.unlink(missing_ok=True)
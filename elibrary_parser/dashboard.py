@@ -0,0 +1,732 @@
+import hashlib
+import logging
+import threading
+
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from scipy import sparse
+
+from .author_metrics import AuthorMetrics
+from .authors import author_mentions, load_thesaurus
+from .search import AuthorSearchIndex
+
+COLORS = px.colors.qualitative.Plotly
+WORK_COLUMNS = ['Title', 'Year', 'Source title', 'Cited by']
+
+
+def wrap_text(txt, width=50):
+    sentences = txt.split('<br>')
+    res = []
+    for sentence in sentences:
+        words = sentence.split(' ')
+        lines, cur = [], ''
+        for w in words:
+            if len(cur) + len(w) + 1 > width:
+                lines.append(cur)
+                cur = w
+            else:
+                cur = f"{cur} {w}".strip()
+        lines.append(cur)
+        res.append('<br>'.join(lines))
+    return '<br>'.join(res)
+
+
+class NetworkData:
+    """ Indexed co-authorship network of an organization for the dashboard
+
+    Nodes are addressed by their row in map.txt and edges by their row in
+    network.txt. Every node keeps the sorted integer ids of its works in one
+    CSR-like array, so the common works of two co-authors are an
+    intersection of two small arrays. Edge descriptions are built on demand,
+    when an edge is hovered, and cached.
+
+    Co-authorship weights and author metrics are also counted per publication
+    year and kept as cumulative sums over the years: row k of a cumulative
+    array holds the totals of the first k years. The weights and metrics of
+    any range of years are then the difference of two rows.
+
+     Attributes
+     ----------
+     nodes: pd.DataFrame
+        map.txt with the 'node_color' column
+     labels: np.ndarray
+        node labels
+     source, target, weight: np.ndarray
+        node positions of the edge endpoints and edge weights, by ascending weight
+     works: pd.DataFrame
+        title, year, source and citations of every work id
+     years: np.ndarray
+        sorted publication years
+     edge_cumsum: np.ndarray
+        (years + 1) x edges cumulative co-authorship weights
+     node_cumsum: dict
+        (years + 1) x nodes cumulative documents, citations, normalized citations and sums of years
+     max_authors: int
+        publications with more authors are not links, as in CoauthorshipNetworkBuilder
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, nodes, edges, publications, replace_dict, max_authors=25):
+        nodes = nodes.reset_index(drop=True)
+        # Impossible years
+        nodes['score<Avg. pub. year>'] = nodes['score<Avg. pub. year>'].clip(upper=datetime.now().year)
+        nodes['node_color'] = [COLORS[(cluster - 1) % len(COLORS)] for cluster in nodes['cluster']]
+        self.nodes = nodes
+        self.labels = nodes['label'].to_numpy()
+
+        # Edges sorted by weight: the edges above a threshold are a suffix of the arrays
+        edges = edges.sort_values('weight', kind='stable')
+        position = pd.Series(np.arange(len(nodes)), index=nodes['id'])
+        self.source = position.reindex(edges['first_author']).to_numpy()
+        self.target = position.reindex(edges['second_author']).to_numpy()
+        self.weight = edges['weight'].to_numpy()
+        self.max_authors = max_authors
+
+        mentions = author_mentions(publications['Authors'], replace_dict)
+        mentions['node'] = pd.Index(self.labels).get_indexer(mentions['author'])
+        self._index_works(publications, mentions)
+        self._index_years(publications, mentions)
+        self._descriptions = {}
+        self._adjacency = None
+        self.logger.info(f"Indexed {len(nodes)} authors, {len(self.weight)} links, {len(self.works)} works "
+                         f"and {len(self.years)} years")
+
+    @classmethod
+    def load(cls, files_dir) -> 'NetworkData':
+        """ Read map.txt, network.txt, publications.csv and the thesaurus of an organization """
+
+        files_dir = Path(files_dir)
+        return cls(
+            nodes=pd.read_csv(files_dir / 'map.txt', sep='\t'),
+            edges=pd.read_csv(files_dir / 'network.txt', sep='\t', header=None,
+                              names=['first_author', 'second_author', 'weight']),
+            publications=pd.read_csv(files_dir / 'publications.csv'),
+            replace_dict=load_thesaurus(files_dir / 'thesaurus_authors.txt'),
+        )
+
+    def _index_works(self, publications, mentions):
+        # Rows with the same title, year, source and citations are one work
+        work_ids = publications.groupby(WORK_COLUMNS, dropna=False, sort=False).ngroup().to_numpy()
+        first_rows = np.unique(work_ids, return_index=True)[1]
+        self.works = publications.iloc[first_rows][WORK_COLUMNS].reset_index(drop=True)
+        # A single non-numeric cell makes the column text, as in AuthorMetrics.publication_table
+        self.works['Cited by'] = pd.to_numeric(self.works['Cited by'], errors='coerce').fillna(0)
+
+        pairs = pd.DataFrame({'node': mentions['node'], 'work': work_ids[mentions['publication']]})
+        pairs = pairs[pairs['node'] >= 0].drop_duplicates().sort_values(['node', 'work'])
+        self.work_ids = pairs['work'].to_numpy()
+        self.work_indptr = np.r_[0, np.cumsum(np.bincount(pairs['node'], minlength=len(self.labels)))]
+
+    def _index_years(self, publications, mentions):
+        # The same authorships as in CoauthorshipNetworkBuilder, so the sum over all years is network.txt
+        authorship = mentions.drop_duplicates(['publication', 'author'])
+        n_authors = authorship.groupby('publication')['author'].transform('size')
+        authorship = authorship[(n_authors <= self.max_authors) & (authorship['node'] >= 0)]
+        table = AuthorMetrics().publication_table(publications).reindex(authorship['publication'])
+        dated = table['year'].notna().to_numpy()
+        authorship, table = authorship[dated], table[dated]
+
+        self.years = np.unique(table['year']).astype(int)
+        year_codes = np.searchsorted(self.years, table['year'].to_numpy())
+        node = authorship['node'].to_numpy()
+        n_years, n_nodes = len(self.years), len(self.labels)
+
+        def cumulative(per_year):
+            return np.vstack([np.zeros((1, per_year.shape[1]), dtype=per_year.dtype), np.cumsum(per_year, axis=0)])
+
+        def node_cumsum(weights=None):
+            per_year = np.bincount(year_codes * n_nodes + node, weights=weights, minlength=n_years * n_nodes)
+            return cumulative(per_year.reshape(n_years, n_nodes))
+
+        self.node_cumsum = {
+            'documents': node_cumsum(),
+            'citations': node_cumsum(table['citations'].to_numpy()),
+            'norm_citations': node_cumsum(table['norm_citations'].to_numpy()),
+            'year_sum': node_cumsum(table['year'].to_numpy()),
+        }
+
+        # Co-authorship counts of every year are looked up among the edges by their sorted pair keys
+        edge_keys = np.minimum(self.source, self.target) * n_nodes + np.maximum(self.source, self.target)
+        key_order = np.argsort(edge_keys)
+        sorted_keys = edge_keys[key_order]
+        publication_codes = pd.factorize(authorship['publication'])[0]
+        n_publications = publication_codes.max() + 1 if len(publication_codes) else 0
+        order = np.argsort(year_codes, kind='stable')
+        bounds = np.searchsorted(year_codes[order], np.arange(n_years + 1))
+        per_year = np.zeros((n_years, len(self.weight)), dtype=np.int32)
+        for year in range(n_years):
+            rows = order[bounds[year]:bounds[year + 1]]
+            incidence = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.int32), (node[rows], publication_codes[rows])),
+                shape=(n_nodes, n_publications)
+            )
+            links = sparse.triu(incidence @ incidence.T, k=1).tocoo()
+            keys = links.row.astype(np.int64) * n_nodes + links.col
+            found = np.searchsorted(sorted_keys, keys).clip(max=max(len(sorted_keys) - 1, 0))
+            known = sorted_keys[found] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+            per_year[year, key_order[found[known]]] = links.data[known]
+        dtype = np.min_scalar_type(int(per_year.sum(axis=0).max(initial=0)))
+        self.edge_cumsum = cumulative(per_year).astype(dtype)
+
+    def year_rows(self, years):
+        """ Rows of the cumulative arrays for the years [first, last], None for all years """
+
+        if years is None or not len(self.years):
+            return None
+        first, last = years
+        if first <= self.years[0] and last >= self.years[-1]:
+            return None
+        return int(np.searchsorted(self.years, first, side='left')), int(np.searchsorted(self.years, last, side='right'))
+
+    def window_weights(self, years=None) -> np.ndarray:
+        """ Edge weights counted over the publications of the years [first, last] """
+
+        rows = self.year_rows(years)
+        if rows is None:
+            return self.weight
+        first, last = rows
+        return self.edge_cumsum[last].astype(np.int64) - self.edge_cumsum[first]
+
+    def window_nodes(self, years=None) -> pd.DataFrame:
+        """ map.txt with the link weights and metrics of the years [first, last] """
+
+        rows = self.year_rows(years)
+        if rows is None:
+            return self.nodes
+        first, last = rows
+        totals = {name: values[last] - values[first] for name, values in self.node_cumsum.items()}
+        weight = self.window_weights(years)
+        n_nodes = len(self.labels)
+
+        def per_node(weights):
+            return (np.bincount(self.source, weights=weights, minlength=n_nodes)
+                    + np.bincount(self.target, weights=weights, minlength=n_nodes))
+
+        def average(values):
+            return np.divide(values, documents, out=np.full(n_nodes, np.nan), where=documents > 0).round(4)
+
+        documents = totals['documents']
+        nodes = self.nodes.copy()
+        nodes['weight<Links>'] = per_node((weight > 0).astype(float)).astype(int)
+        nodes['weight<Total link strength>'] = per_node(weight.astype(float)).astype(int)
+        nodes['weight<Documents>'] = documents.astype(int)
+        nodes['weight<Citations>'] = np.rint(totals['citations']).astype(int)
+        nodes['weight<Norm. citations>'] = totals['norm_citations'].round(4)
+        nodes['score<Avg. pub. year>'] = average(totals['year_sum'])
+        nodes['score<Avg. citations>'] = average(totals['citations'])
+        nodes['score<Avg. norm. citations>'] = average(totals['norm_citations'])
+        return nodes
+
+    def adjacency(self) -> sparse.csr_matrix:
+        """ Symmetric node x node matrix of the edges, built on first use """
+
+        if self._adjacency is None:
+            n = len(self.labels)
+            ones = np.ones(2 * len(self.source), dtype=np.int8)
+            endpoints = (np.r_[self.source, self.target], np.r_[self.target, self.source])
+            self._adjacency = sparse.csr_matrix((ones, endpoints), shape=(n, n))
+        return self._adjacency
+
+    def hops(self, node, max_hops=2) -> np.ndarray:
+        """ Number of links from the node to every node, -1 beyond max_hops """
+
+        adjacency = self.adjacency()
+        distance = np.full(len(self.labels), -1)
+        distance[node] = 0
+        frontier = np.array([node])
+        for hop in range(1, max_hops + 1):
+            neighbours = np.unique(adjacency[frontier].indices)
+            frontier = neighbours[distance[neighbours] < 0]
+            distance[frontier] = hop
+        return distance
+
+    def edge_start(self, threshold) -> int:
+        """ Position of the first edge with at least the given weight """
+
+        if threshold is None:
+            return 0
+        return int(np.searchsorted(self.weight, threshold, side='left'))
+
+    def node_works(self, node) -> np.ndarray:
+        return self.work_ids[self.work_indptr[node]:self.work_indptr[node + 1]]
+
+    def common_works(self, first, second) -> np.ndarray:
+        """ Ids of the common works of two nodes, most cited first """
+
+        common = np.intersect1d(self.node_works(first), self.node_works(second), assume_unique=True)
+        citations = self.works['Cited by'].to_numpy()[common]
+        return common[np.argsort(-citations, kind='stable')]
+
+    def edge_description(self, edge, max_display=3) -> str:
+        """ Hover text of an edge: the most cited common works of its authors """
+
+        if edge not in self._descriptions:
+            common = self.common_works(self.source[edge], self.target[edge])
+            works = self.works.iloc[common[:max_display]]
+            res = [f"{number}. {title}, {year}"
+                   for number, (title, year) in enumerate(zip(works['Title'], works['Year']), 1)]
+            if len(common) > max_display:
+                res.append(f"\nи ещё {len(common) - max_display} совместных работ.")
+            self._descriptions[edge] = wrap_text('<br>'.join(res))
+        return self._descriptions[edge]
+
+
+class GridIndex:
+    """ Uniform grid over the node coordinates for rectangle queries
+
+    Nodes are sorted by cell, column by column, so the cells of one grid
+    column inside a rectangle are one contiguous slice of the sorted nodes.
+    """
+
+    def __init__(self, x, y, cells=64):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.cells = cells
+        if len(self.x):
+            self.low = np.array([self.x.min(), self.y.min()])
+            span = max(np.ptp(self.x), np.ptp(self.y))
+        else:
+            self.low, span = np.zeros(2), 0.0
+        self.cell = (span or 1.0) / cells
+        cell_ids = self._cell(self.x, 0) * cells + self._cell(self.y, 1)
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.indptr = np.r_[0, np.cumsum(np.bincount(cell_ids, minlength=cells * cells))]
+
+    def _cell(self, values, axis):
+        return np.clip((np.asarray(values, dtype=float) - self.low[axis]) / self.cell, 0, self.cells - 1).astype(np.int64)
+
+    def query(self, x0, x1, y0=None, y1=None) -> np.ndarray:
+        """ Sorted positions of the nodes inside the rectangle, all y when y0 and y1 are None """
+
+        if y0 is None or y1 is None:
+            y0, y1 = -np.inf, np.inf
+        column0, column1 = self._cell([x0, x1], 0)
+        row0, row1 = self._cell([y0, y1], 1)
+        found = np.concatenate([np.zeros(0, dtype=np.int64)] + [
+            self.order[self.indptr[column * self.cells + row0]:self.indptr[column * self.cells + row1 + 1]]
+            for column in range(column0, column1 + 1)
+        ])
+        x, y = self.x[found], self.y[found]
+        return np.sort(found[(x0 <= x) & (x <= x1) & (y0 <= y) & (y <= y1)])
+
+
+class NetworkTraces:
+    """ Plotly traces of the network
+
+    The figure always consists of the same traces in the same order, so
+    callbacks can address them by position: NodesHover, EdgeWeightsHover,
+    one 'Edges' trace per cluster colour, EdgeWeights and Nodes. Every edge
+    is drawn as two half segments in the colours of its endpoints; the
+    segments of a colour are assembled from coordinate arrays with NaN
+    separators, and a threshold only changes the slice of the weight-sorted
+    edges that is drawn.
+
+    Large networks are drawn with levels of detail. A view is None (all
+    authors), {'level': 'clusters'} (one super-node per cluster, linked by
+    the summed weights of the links between clusters) or {'level': 'nodes',
+    'nodes': [...]} (the authors in the viewport, the largest ones when
+    there are too many). Views are plain dicts, so they fit in a dcc.Store.
+
+    `years` is an optional [first, last] range of publication years: the
+    edges and node sizes then come from the co-authorships of these years.
+
+     Attributes
+     ----------
+     lod_min_nodes: int
+        networks with fewer authors are always drawn in full
+     cluster_zoom: float
+        below this zoom level a large network is drawn by clusters
+     max_nodes: int
+        maximal number of authors drawn in a viewport
+    """
+
+    NODES_HOVER = 0
+    EDGE_WEIGHTS_HOVER = 1
+    FIRST_EDGES = 2
+
+    def __init__(self, data: NetworkData, lod_min_nodes=5000, cluster_zoom=2.0, max_nodes=3000):
+        self.data = data
+        self.lod_min_nodes = lod_min_nodes
+        self.cluster_zoom = cluster_zoom
+        self.max_nodes = max_nodes
+
+        self.x = data.nodes['x'].to_numpy(dtype=float)
+        self.y = data.nodes['y'].to_numpy(dtype=float)
+        self.x_range = float(np.ptp(self.x)) if len(self.x) else 0.0
+        self.grid = GridIndex(self.x, self.y)
+        color_codes, colors = pd.factorize(data.nodes['node_color'])
+        self.color_codes = color_codes
+        self.colors = list(colors)
+        self.edge_weights = self.FIRST_EDGES + len(self.colors)
+        self.nodes = self.edge_weights + 1
+
+        cluster_codes, cluster_ids = pd.factorize(data.nodes['cluster'], sort=True)
+        self.cluster_codes = cluster_codes
+        self.cluster_ids = np.asarray(cluster_ids)
+        self.cluster_sizes = np.bincount(cluster_codes, minlength=len(cluster_ids))
+        self.cluster_x = np.bincount(cluster_codes, weights=self.x, minlength=len(cluster_ids)) / self.cluster_sizes
+        self.cluster_y = np.bincount(cluster_codes, weights=self.y, minlength=len(cluster_ids)) / self.cluster_sizes
+        self.cluster_color_codes = np.zeros(len(cluster_ids), dtype=np.int64)
+        self.cluster_color_codes[cluster_codes] = color_codes
+
+    @property
+    def lod(self) -> bool:
+        return len(self.x) >= self.lod_min_nodes
+
+    def view(self, viewport=None, size_metric='weight<Links>', years=None):
+        """ View for the visible rectangle {'x0', 'x1'[, 'y0', 'y1']}, the whole plot when None """
+
+        if not self.lod:
+            return None
+        if not viewport or not self.x_range or viewport['x1'] <= viewport['x0']:
+            return {'level': 'clusters'}
+        x0, x1 = viewport['x0'], viewport['x1']
+        if self.x_range / (x1 - x0) < self.cluster_zoom:
+            return {'level': 'clusters'}
+
+        # A margin keeps the edges that cross the border of the viewport
+        margin = (x1 - x0) / 4
+        y0, y1 = viewport.get('y0'), viewport.get('y1')
+        if y0 is not None and y1 is not None:
+            y0, y1 = y0 - (y1 - y0) / 4, y1 + (y1 - y0) / 4
+        nodes = self.grid.query(x0 - margin, x1 + margin, y0, y1)
+        if len(nodes) > self.max_nodes:
+            values = self.data.window_nodes(years)[size_metric].to_numpy()[nodes]
+            nodes = np.sort(nodes[np.argsort(-values, kind='stable')[:self.max_nodes]])
+        return {'level': 'nodes', 'nodes': nodes.tolist()}
+
+    def node_values(self, values, view=None, how='sum') -> np.ndarray:
+        """ Values of the drawn points from per-author values,
+        clusters aggregate them by 'sum', 'mean' or 'any' """
+
+        values = np.asarray(values)
+        if view is None:
+            return values
+        if view['level'] == 'nodes':
+            return values[np.asarray(view['nodes'], dtype=np.int64)]
+        values = values.astype(float)
+        known = ~np.isnan(values)
+        total = np.bincount(self.cluster_codes[known], weights=values[known], minlength=len(self.cluster_ids))
+        if how == 'any':
+            return total > 0
+        if how == 'mean':
+            counts = np.bincount(self.cluster_codes[known], minlength=len(self.cluster_ids))
+            return np.divide(total, counts, out=np.full(len(total), np.nan), where=counts > 0)
+        return total
+
+    def node_colors(self, view=None) -> list:
+        """ Cluster colours of the drawn points """
+
+        colors = np.array(self.colors, dtype=object)
+        if view is not None and view['level'] == 'clusters':
+            return colors[self.cluster_color_codes].tolist()
+        return colors[self.node_values(self.color_codes, view)].tolist()
+
+    def _points(self, view):
+        """ x, y, colour codes, labels and hover texts of the drawn points """
+
+        labels = self.data.labels
+        if view is None:
+            return self.x, self.y, self.color_codes, labels, labels
+        if view['level'] == 'nodes':
+            nodes = np.asarray(view['nodes'], dtype=np.int64)
+            return self.x[nodes], self.y[nodes], self.color_codes[nodes], labels[nodes], labels[nodes]
+        labels = [f"Кластер {cluster}" for cluster in self.cluster_ids]
+        hover = [f"Кластер {cluster}: {size} авторов" for cluster, size in zip(self.cluster_ids, self.cluster_sizes)]
+        return self.cluster_x, self.cluster_y, self.cluster_color_codes, labels, hover
+
+    def _edges(self, threshold, view, years=None):
+        """ Endpoints (positions among the drawn points), weights and edge ids
+        of the edges above the threshold; links between clusters have id -1 """
+
+        if self.data.year_rows(years) is None:
+            ids = np.arange(self.data.edge_start(threshold), len(self.data.weight))
+            weight = self.data.weight[ids]
+        else:
+            weight = self.data.window_weights(years)
+            ids = np.flatnonzero(weight >= max(threshold or 1, 1))
+            ids = ids[np.argsort(weight[ids], kind='stable')]
+            weight = weight[ids]
+        source, target = self.data.source[ids], self.data.target[ids]
+        if view is None:
+            return source, target, weight, ids
+        if view['level'] == 'nodes':
+            nodes = np.asarray(view['nodes'], dtype=np.int64)
+            local = np.full(len(self.x), -1)
+            local[nodes] = np.arange(len(nodes))
+            source, target = local[source], local[target]
+            keep = (source >= 0) & (target >= 0)
+            return source[keep], target[keep], weight[keep], ids[keep]
+
+        source, target = self.cluster_codes[source], self.cluster_codes[target]
+        between = source != target
+        n_clusters = len(self.cluster_ids)
+        pair_ids = np.minimum(source, target)[between] * n_clusters + np.maximum(source, target)[between]
+        pairs, inverse = np.unique(pair_ids, return_inverse=True)
+        totals = np.rint(np.bincount(inverse, weights=weight[between], minlength=len(pairs))).astype(np.int64)
+        return pairs // n_clusters, pairs % n_clusters, totals, np.full(len(pairs), -1)
+
+    @staticmethod
+    def scaled_sizes(values):
+        """ Marker and label font sizes for the node metric values """
+
+        values = np.asarray(values, dtype=float)
+        span = values.max() - values.min() if len(values) else 0
+        scaled = (values - values.min()) / (span or 1)
+        return 12 + 30 * scaled, np.clip(8 + 10 * scaled, 8, 16)
+
+    def edge_segments(self, x, y, color_codes, source, target):
+        """ x and y arrays of the half segments of every colour """
+
+        mid_x = np.tile((x[source] + x[target]) / 2, 2)
+        mid_y = np.tile((y[source] + y[target]) / 2, 2)
+        end_x = np.concatenate([x[source], x[target]])
+        end_y = np.concatenate([y[source], y[target]])
+        codes = color_codes[np.concatenate([source, target])]
+
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(self.colors) + 1))
+        segments = []
+        for color in range(len(self.colors)):
+            members = order[bounds[color]:bounds[color + 1]]
+            gap = np.full(len(members), np.nan)
+            segments.append((
+                np.column_stack([end_x[members], mid_x[members], gap]).ravel(),
+                np.column_stack([end_y[members], mid_y[members], gap]).ravel(),
+            ))
+        return segments
+
+    def edge_traces(self, threshold=None, show_weights=True, view=None, years=None) -> list:
+        """ EdgeWeightsHover, the 'Edges' traces and EdgeWeights for the edges above the threshold """
+
+        x, y, color_codes, _, _ = self._points(view)
+        source, target, weight, ids = self._edges(threshold, view, years)
+        mid_x = (x[source] + x[target]) / 2
+        mid_y = (y[source] + y[target]) / 2
+
+        weight_trace_hover = go.Scattergl(
+            x = mid_x,
+            y = mid_y,
+            mode = 'markers',
+            marker = dict(size=9, color='#fff'),
+            opacity = 0,
+            hoverinfo = 'none',
+            customdata = ids,
+            name = 'EdgeWeightsHover'
+        )
+        edge_traces = [
+            go.Scattergl(
+                x = segment_x,
+                y = segment_y,
+                mode = 'lines',
+                hoverinfo = 'none',
+                line = dict(color=color),
+                opacity = 0.25,
+                name = 'Edges'
+            )
+            for color, (segment_x, segment_y) in zip(
+                self.colors, self.edge_segments(x, y, color_codes, source, target)
+            )
+        ]
+        weight_trace = go.Scattergl(
+            x = mid_x,
+            y = mid_y,
+            mode = 'markers+text',
+            marker = dict(size=9, color='#ffffff'),
+            text = weight,
+            textposition = 'middle center',
+            hoverinfo = 'none',
+            textfont = dict(size=8, color='rgba(0,0,0,1)' if show_weights else 'rgba(0,0,0,0)'),
+            name = 'EdgeWeights'
+        )
+        return [weight_trace_hover] + edge_traces + [weight_trace]
+
+    def node_traces(self, size_metric='weight<Links>', view=None, years=None):
+        """ NodesHover and Nodes traces """
+
+        x, y, _, labels, hover = self._points(view)
+        sizes, font_sizes = self.scaled_sizes(self.node_values(self.data.window_nodes(years)[size_metric], view))
+        colors = self.node_colors(view)
+        node_trace_hover = go.Scattergl(
+            x = x,
+            y = y,
+            mode = 'markers',
+            hoverinfo = 'text',
+            hovertext = hover,
+            marker = dict(size=12, color=colors),
+            opacity = 0,
+            hoverlabel = dict(font_color='#fff'),
+            name = 'NodesHover'
+        )
+        node_trace = go.Scattergl(
+            x = x,
+            y = y,
+            mode = 'markers+text',
+            hoverinfo = 'text',
+            text = labels,
+            hovertext = hover,
+            marker = dict(size=sizes, color=colors),
+            textposition = 'middle center',
+            hoverlabel = dict(font_color='#fff'),
+            textfont = dict(size=font_sizes, color='rgba(0,0,0,0)'),
+            name = 'Nodes'
+        )
+        return node_trace_hover, node_trace
+
+    def traces(self, threshold=None, size_metric='weight<Links>', show_weights=True, view=None, years=None) -> list:
+        node_trace_hover, node_trace = self.node_traces(size_metric, view, years)
+        return [node_trace_hover] + self.edge_traces(threshold, show_weights, view, years) + [node_trace]
+
+
+class OrganizationNetwork:
+    """ Everything the dashboard needs for one organization
+
+     Attributes
+     ----------
+     version: str
+        version of the prepared files, see OrganizationCache.version
+     results: ResultCache
+        memoized traces and node values, None to compute them every time
+     meta: dict
+        trace positions and the initial x range for the client-side callbacks in assets/network.js
+    """
+
+    def __init__(self, data: NetworkData, org_id=None, version=None, results=None):
+        self.data = data
+        self.org_id = org_id
+        self.version = version
+        self.results = results
+        self.nodes = data.nodes
+        self.traces = NetworkTraces(data)
+        self.search_index = AuthorSearchIndex(data.labels, data.nodes['weight<Links>'])
+        self.meta = {
+            'nodes': self.traces.nodes,
+            'edge_weights': self.traces.edge_weights,
+            'lod': self.traces.lod,
+            'x_range': self.traces.x_range,
+        }
+
+    def memoize(self, name, params, compute):
+        """ compute() for the named computation with the given parameters,
+        served from the result cache when it has been done before """
+
+        if self.results is None:
+            return compute()
+        return self.results.memoize((self.org_id, self.version, name, params), compute)
+
+
+class OrganizationCache:
+    """ Networks of organizations loaded on first request
+
+    An organization is a directory org_data/processed/<org_id> with map.txt.
+    Only the `maxsize` most recently used networks stay in memory, so one
+    server process can serve any number of organizations. Loading is done
+    outside the lock: requests for cached organizations are not blocked by
+    a slow load, and two requests for the same new organization at worst
+    load it twice. A network is loaded again when its files change.
+
+    Preloaded networks are pinned: they are never evicted, so networks
+    loaded in the master process before the workers fork stay shared
+    between the workers.
+
+     Attributes
+     ----------
+     data_path: Path
+        directory with processed/<org_id> subdirectories
+     maxsize: int
+        maximal number of networks kept in memory
+     results: ResultCache
+        memoized results of the networks, None to turn memoization off
+    """
+
+    logger = logging.getLogger(__name__)
+
+    DATA_FILES = ['map.txt', 'network.txt', 'publications.csv', 'thesaurus_authors.txt']
+
+    def __init__(self, data_path='org_data', maxsize=4, results=None):
+        self.data_path = Path(data_path)
+        self.maxsize = maxsize
+        self.results = results
+        self._networks = OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+    def files_dir(self, org_id):
+        """ Directory with the prepared files of the organization, None if there is none """
+
+        org_id = str(org_id)
+        if not org_id.isdigit():
+            return None
+        files_dir = self.data_path / 'processed' / org_id
+        return files_dir if (files_dir / 'map.txt').is_file() else None
+
+    def organizations(self) -> list:
+        processed = self.data_path / 'processed'
+        if not processed.is_dir():
+            return []
+        org_ids = [path.name for path in processed.iterdir() if self.files_dir(path.name) is not None]
+        return sorted(org_ids, key=int)
+
+    def version(self, files_dir) -> str:
+        """ Modification times and sizes of the prepared files """
+
+        stats = []
+        for name in self.DATA_FILES:
+            try:
+                stat = (files_dir / name).stat()
+            except FileNotFoundError:
+                continue
+            stats.append(f'{name}:{stat.st_mtime_ns}:{stat.st_size}')
+        return hashlib.sha1(';'.join(stats).encode('utf-8')).hexdigest()[:16]
+
+    def get(self, org_id):
+        """ Network of the organization or None if it has no prepared files """
+
+        org_id = str(org_id)
+        files_dir = self.files_dir(org_id)
+        if files_dir is None:
+            return None
+        version = self.version(files_dir)
+        with self._lock:
+            network = self._pinned.get(org_id)
+            if network is not None and network.version == version:
+                return network
+            network = self._networks.get(org_id)
+            if network is not None and network.version == version:
+                self._networks.move_to_end(org_id)
+                return network
+
+        self.logger.info(f"Loading network of organization {org_id}")
+        network = OrganizationNetwork(NetworkData.load(files_dir), org_id, version, self.results)
+
+        with self._lock:
+            # A pinned organization stays pinned: the new version replaces the old one
+            if org_id in self._pinned:
+                self._pinned[org_id] = network
+                return network
+            self._networks[org_id] = network
+            self._networks.move_to_end(org_id)
+            while len(self._networks) > self.maxsize:
+                evicted, _ = self._networks.popitem(last=False)
+                self.logger.info(f"Evicted network of organization {evicted}")
+        return network
+
+    def preload(self, org_ids):
+        """ Load and pin the networks, including the parts that are otherwise built on first use """
+
+        for org_id in org_ids:
+            network = self.get(org_id)
+            if network is None:
+                self.logger.warning(f"No prepared files of organization {org_id} to preload")
+                continue
+            network.data.adjacency()
+            with self._lock:
+                self._networks.pop(str(org_id), None)
+                self._pinned[str(org_id)] = network
@@ -2,7 +2,9 @@ import re
 import time
 import random
 import logging
+import threading
 
+from contextlib import nullcontext
 from pathlib import Path
 
 from selenium import webdriver
@@ -14,7 +16,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 
 from elibrary_parser import config
-from elibrary_parser import logging_config
+from elibrary_parser.instrumentation import DISABLED
 
 class Downloader:
     
@@ -25,14 +27,21 @@ class Downloader:
         'Opera/9.80 (Windows NT 6.1; WOW64) Presto/2.12.388 Version/12.16',
     )
     logger = logging.getLogger(__name__)
+    # Search parameters: lists of options of the spans, values of the selects, states of the checkboxes
+    SPANS = ('rubrics', 'titles', 'orgs', 'authors', 'years', 'types', 'roles', 'orgroles')
+    SELECTS = ('orgdepid', 'show_option', 'show_sotr', 'sortorder', 'order')
+    CHECKBOXES = ('show_refs', 'hide_doubles')
+    # Downloaders of several threads ask their questions on the console one at a time
+    console_lock = threading.Lock()
     
-    def __init__(self, org_id, data_path = 'data/', headless=True):
+    def __init__(self, org_id, data_path = 'data/', headless=True, metrics=None):
         self.org_id = org_id
         self.data_path = Path(data_path)
         self.headless = headless
         self.driver = None
         self.files_dir = None
         self.driver_path = config.DRIVER_PATH
+        self.metrics = metrics or DISABLED
             
     def setup(self):
         options = Options()
@@ -57,23 +66,28 @@ class Downloader:
         self.files_dir.mkdir(exist_ok=True, parents=True)
         
     def _get_page_source(self, url):
-        self.driver.get(url)
+        with self.metrics.timer('downloader_navigation_seconds', action='open'):
+            self.driver.get(url)
         self.logger.info(f"Navigated to URL: {url}")
         return self.driver.page_source
     
     def _save_current_page(self, page_number : int, source: str):
         file_path = self.files_dir / f"page_{page_number}.html"
-        self.bypass_block_if_present()
         with open(file_path, 'w', encoding='utf-8') as file:
             file.write(source)
+        # The file size costs a stat call, so it is only taken for enabled metrics
+        if self.metrics.enabled:
+            self.metrics.count('downloader_page_bytes_total', file_path.stat().st_size)
         self.logger.info(f"Saved page: {page_number} to {file_path}.")
     
     def _go_to_next_page(self) -> bool:
         try:
-            self.driver.find_element(By.LINK_TEXT, 'Следующая страница').click()
+            with self.metrics.timer('downloader_navigation_seconds', action='next'):
+                self.driver.find_element(By.LINK_TEXT, 'Следующая страница').click()
             # sleep_seconds = random.randint(2, 5)
-            WebDriverWait(self.driver, 20).until(
-                    EC.invisibility_of_element_located((By.ID, 'loading')))
+            with self.metrics.timer('downloader_render_seconds', action='next'):
+                WebDriverWait(self.driver, 20).until(
+                        EC.invisibility_of_element_located((By.ID, 'loading')))
             # self.logger.info(f"Sleeping for {sleep_seconds} seconds before next page.")
             # time.sleep(sleep_seconds)
             return True
@@ -81,48 +95,70 @@ class Downloader:
             self.logger.warning("No more pages found!")
             return False
         except Exception as e:
+            self.metrics.count('downloader_navigation_errors_total', error=type(e).__name__)
             self.logger.error(f"Error navigating to next page: {e}")
             return False
         
         
-    def find_publications(self):
-        
+    def listing_pages(self, parameters=True, search=None):
+        """ Sources of the publication listing pages of the organization, one after another
+
+        :param parameters: set the search parameters; without them the listing has all the publications
+        :param search: search parameters, see enable_parameters
+        """
+
         org_page_url = f'https://www.elibrary.ru/org_items.asp?orgsid={self.org_id}'
         self.logger.info(f"Starting publication search for organization ID: {self.org_id}")
 
         self.logger.info(f"Navigating to organization page URL: {org_page_url}. (expecting about 1 min wait)")
-        current_page_source = self._get_page_source(org_page_url)
+        self._get_page_source(org_page_url)
         self.logger.info("Successfully loaded organization page.")
 
-        self.bypass_block_if_present()
-        
-        self.enable_parameters()
-        
-        self.bypass_block_if_present()
-        
-        page_number = 1
+        if parameters:
+            self.bypass_block_if_present()
+            self.enable_parameters(search)
+
         while True:
-            self._save_current_page(page_number, self.driver.page_source)
-            
+            self.bypass_block_if_present()
+            self.metrics.count('downloader_pages_total')
+            yield self.driver.page_source
+
             if not self._go_to_next_page():
                 break
+
+    def find_publications(self, search=None):
+        for page_number, source in enumerate(self.listing_pages(search=search), start=1):
+            self._save_current_page(page_number, source)
             
-            page_number += 1
-            
-    def enable_parameters(self):
+    def enable_parameters(self, search=None):
+        """ Set the search parameters of the organization page
+
+        :param search: {parameter: value}; option labels to tick for the spans (SPANS), an option value
+            or name for the selects (SELECTS), True or False for the checkboxes (CHECKBOXES). An empty
+            list or None selects nothing. Parameters missing from it are asked on the console.
+        """
+
+        search = search or {}
         self.logger.info("Enabling search parameters...")
-        params = ['rubrics', 'titles', 'orgs', 'authors', 'years', 'types', 'roles', 'orgroles']
-        selection_made = [self.chose_span(something=param) for param in params]
-        params = ['orgdepid', 'show_option', 'show_sotr', 'sortorder', 'order']
-        for param in params:
-            selection_made.append(self.chose_select_option(select_id=param))
-        selection_made.append(self.select_checkbox_options())
+        missing = [param for param in self.SPANS + self.SELECTS + self.CHECKBOXES if param not in search]
+        with self.console_lock if missing else nullcontext():
+            selection_made = [
+                self.select_span(param, search[param]) if param in search else self.chose_span(something=param)
+                for param in self.SPANS
+            ]
+            for param in self.SELECTS:
+                if param in search:
+                    selection_made.append(self.apply_select_option(param, search[param]))
+                else:
+                    selection_made.append(self.chose_select_option(select_id=param))
+            selection_made.append(self.select_checkbox_options(search.get('show_refs'), search.get('hide_doubles')))
         if any(selection_made):
             try:
                 self.driver.find_element(By.XPATH, "//div[@class='butred' and contains(text(), 'Поиск')]").click()
                 self.logger.info("Successfully clicked the 'Поиск' button.")
-                WebDriverWait(self.driver, 20).until(
-                    EC.invisibility_of_element_located((By.ID, 'loading')))
+                with self.metrics.timer('downloader_render_seconds', action='search'):
+                    WebDriverWait(self.driver, 20).until(
+                        EC.invisibility_of_element_located((By.ID, 'loading')))
             except Exception as e:
                 self.logger.error(f"An unexpected error occurred while clicking the 'Поиск' button: {e}")
                 raise
@@ -142,10 +178,15 @@ class Downloader:
             self.logger.error(f"An error occurred while trying to click checkbox! Exception: {e}")
             return False
     
-    def select_checkbox_options(self) -> bool:
-        
-        check_show_refs = input("\n[ ] - учитывать публикации, извлеченные из списков цитируемой литературы? (y/N): ").lower() in {'y', 'yes'}
-        check_hide_doubles = input("\n[✓] - объединять оригинальные и переводные версии статей и переиздания книг? (Y/n): ").lower()  in {'n', 'no'}
+    def select_checkbox_options(self, show_refs=None, hide_doubles=None) -> bool:
+        """ Toggle the checkboxes that differ from the page defaults, asking for the states that are None """
+
+        if show_refs is None:
+            show_refs = input("\n[ ] - учитывать публикации, извлеченные из списков цитируемой литературы? (y/N): ").lower() in {'y', 'yes'}
+        if hide_doubles is None:
+            hide_doubles = input("\n[✓] - объединять оригинальные и переводные версии статей и переиздания книг? (Y/n): ").lower() not in {'n', 'no'}
+        check_show_refs = show_refs
+        check_hide_doubles = not hide_doubles
         
         if not check_hide_doubles and not check_show_refs:
             return False
@@ -215,6 +256,17 @@ class Downloader:
             self.logger.error(f'An error occurred while getting options for <select> ID {select_id}: {e}')
             return {}
     
+    def apply_select_option(self, select_id: str, wanted) -> bool:
+        """ Select the option of a dropdown whose value or name is wanted, nothing for None """
+
+        if wanted is None:
+            return False
+        for option in self.get_select_option(select_id).values():
+            if str(wanted) in (option['value'], option['name']):
+                return self.select_option_by_id(select_id, option['value'], option['name'])
+        self.logger.warning(f"No option '{wanted}' for <select> ID {select_id}")
+        return False
+
     def chose_select_option(self, select_id : str) -> bool:
         
         usr_input = input(f"Do you need to choose an option for {select_id}? (y/N) ")
@@ -258,7 +310,7 @@ class Downloader:
                     text = tds[1].text.strip()  
                     m = re.match(r'(.+?)\s*\((\d+)\)\s*$', text)
                     if m:
-                        available_something[key] = checkbox_id
+                        available_something[key] = {"id": checkbox_id, "name": m.group(1)}
                         print(f'[{key}] {m.group(0)}')
                 except Exception as e:
                     self.logger.error("Exception: ", e)
@@ -276,11 +328,27 @@ class Downloader:
         usr_input = input(f"\nEnter key numbers (-1 if no span needed): ")
         if usr_input == '-1': return False
         for key in self.parse_ranges(usr_input):
-            checkbox_id = available_something[key]
+            checkbox_id = available_something[key]["id"]
             if self.click_checkbox_by_id(checkbox_id):
                 self.logger.info(f"Selected {something}: [{key}]")
         return True
     
+    def select_span(self, something, names) -> bool:
+        """ Tick the options of a span whose names are given, e.g. years ['2023', '2024'] """
+
+        if not names:
+            return False
+        wanted = {str(name).strip().lower() for name in names}
+        selected = False
+        for option in self.get_span(something).values():
+            if option["name"].strip().lower() in wanted and self.click_checkbox_by_id(option["id"]):
+                wanted.discard(option["name"].strip().lower())
+                self.logger.info(f"Selected {something}: {option['name']}")
+                selected = True
+        if wanted:
+            self.logger.warning(f"No {something} options {sorted(wanted)}")
+        return selected
+
     @staticmethod
     def parse_ranges(usr_input : str) -> set:
         res = set()
@@ -294,12 +362,16 @@ class Downloader:
     
     def bypass_block_if_present(self):
         try:
-            WebDriverWait(self.driver, 2).until(
-                EC.presence_of_element_located((By.XPATH, "//iframe[contains(@src, 'recaptcha')]"))
-            )
-            print()
-            self.logger.warning("Pass the captcha and press enter")
-            input()
+            # Without a captcha the check waits for the whole timeout
+            with self.metrics.timer('downloader_captcha_check_seconds'):
+                WebDriverWait(self.driver, 2).until(
+                    EC.presence_of_element_located((By.XPATH, "//iframe[contains(@src, 'recaptcha')]"))
+                )
+            self.metrics.count('downloader_captcha_hits_total')
+            with self.console_lock, self.metrics.timer('downloader_captcha_wait_seconds'):
+                print()
+                self.logger.warning(f"Organization {self.org_id}: pass the captcha and press enter")
+                input()
             self.logger.info("Blocking successfully passed!")
         except Exception:
             self.logger.info("Blocking is not detected or could not be bypassed - continue!")
@@ -1,20 +1,28 @@
 import bs4
+import html
 import re
 import logging
 
 from pathlib import Path
 from bs4 import BeautifulSoup
 
-from .types import Publication
+from .instrumentation import DISABLED
+from .types import ITEM_ID_PATTERN, Publication
 
 class ElibraryHTMLParser:
     
     logger = logging.getLogger(__name__)
+
+    RESULTS_TABLE = re.compile(r'<table\b[^>]*\bid=["\']?restab\b', re.IGNORECASE)
+    TABLE_TAG = re.compile(r'<(/?)(table|tr)\b', re.IGNORECASE)
+    CELL = re.compile(r'<td\b[^>]*>(.*?)</td\s*>', re.IGNORECASE | re.DOTALL)
+    TAG = re.compile(r'<[^>]*>')
     
-    def __init__(self, org_id, data_path = 'data/'):
+    def __init__(self, org_id, data_path = 'data/', metrics=None):
         self.org_id = org_id
         self.data_path = Path(data_path)
         self.files_dir = self.data_path / 'raw' / self.org_id
+        self.metrics = metrics or DISABLED
         
     def parse_publications(self):
         """ Get trough the html file and save information from it"""
@@ -24,25 +32,79 @@ class ElibraryHTMLParser:
         self.logger.info(f"Parsing publications for organization '{self.org_id}'")
         for file in html_files:
             self.logger.info(f"Reading {file.name}...")
-            with open(file, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'html.parser')
-
-            for cell in self.create_table_cells(soup):
-                info = self.get_info(cell)
-                pub = Publication(
-                    title=self.get_title(cell),
-                    authors=self.get_authors(cell),
-                    info=info,
-                    link=self.get_link(cell),
-                    cited_by=self.get_cited_by(cell),
-                    source_id=self.get_source_id(cell)
-                )
-                pub.get_year()
-                if pub.authors != '-' and pub not in unique_pubs:
-                    publications.append(pub)
-                    unique_pubs.add(pub)
+            with self.metrics.timer('parser_page_seconds'):
+                with open(file, 'r', encoding='utf-8') as f:
+                    html = f.read()
+                with self.metrics.timer('parser_soup_seconds'):
+                    soup = BeautifulSoup(html, 'html.parser')
+
+                cells = self.create_table_cells(soup)
+                new_pubs = 0
+                for cell in cells:
+                    info = self.get_info(cell)
+                    pub = Publication(
+                        title=self.get_title(cell),
+                        authors=self.get_authors(cell),
+                        info=info,
+                        link=self.get_link(cell),
+                        cited_by=self.get_cited_by(cell),
+                        source_id=self.get_source_id(cell)
+                    )
+                    pub.get_year()
+                    if pub.authors != '-' and pub not in unique_pubs:
+                        publications.append(pub)
+                        unique_pubs.add(pub)
+                        new_pubs += 1
+            self.metrics.count('parser_pages_total')
+            if self.metrics.enabled:
+                self.metrics.count('parser_html_bytes_total', file.stat().st_size)
+            self.metrics.observe('parser_page_publications', len(cells))
+            self.metrics.count('parser_publications_total', new_pubs)
+            self.metrics.count('parser_skipped_total', len(cells) - new_pubs)
         return publications
 
+    @classmethod
+    def parse_citations(cls, source: str) -> dict:
+        """ Citation counts of a listing page by item id, found with regular expressions
+        instead of building the document tree
+
+        The first item link of a row of the results table is the title link of the
+        publication, the row ends with the first </tr> outside the tables nested in
+        it, and the last cell of the row is the number of citations.
+        """
+
+        citations = {}
+        table = cls.RESULTS_TABLE.search(source)
+        if table is None:
+            return citations
+        table_end = cls._closing_tag(source, table.end(), 'table')
+        position = table.end()
+        while True:
+            link = ITEM_ID_PATTERN.search(source, position, table_end)
+            if link is None:
+                break
+            row_end = min(cls._closing_tag(source, link.end(), 'tr'), table_end)
+            cells = cls.CELL.findall(source, link.end(), row_end)
+            if cells:
+                citations[link.group(1)] = html.unescape(cls.TAG.sub('', cells[-1])).strip()
+            position = row_end
+        return citations
+
+    @classmethod
+    def _closing_tag(cls, source: str, position: int, name: str) -> int:
+        """ Position of the first closing tag outside the tables nested after the position """
+
+        depth = 0
+        for tag in cls.TABLE_TAG.finditer(source, position):
+            closing, tag_name = tag.group(1), tag.group(2).lower()
+            if closing and tag_name == name and depth == 0:
+                return tag.start()
+            if tag_name == 'table':
+                depth += -1 if closing else 1
+                if depth < 0:
+                    return tag.start()
+        return len(source)
+
     @staticmethod
     def create_table_cells(soup):
         publications_table = soup.find_all('table', id="restab")[0]
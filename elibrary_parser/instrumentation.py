@@ -0,0 +1,158 @@
+import json
+import logging
+import math
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+
+class Metrics:
+    """ Counters and timings of a pipeline run
+
+    Counters add up values (pages, captcha hits, bytes). Observations keep
+    the count, sum, minimum and maximum of a value, e.g. the seconds of every
+    page navigation or the publications of every parsed page; `timer` is a
+    context manager that observes the seconds of its block. Names may carry
+    labels, as in Prometheus. A disabled instance does nothing: every method
+    returns at the first line and `timer` returns a shared empty context.
+
+    The run report is written as JSON and in the Prometheus text format:
+
+        metrics = Metrics()
+        with metrics.timer('parser_page_seconds'):
+            ...
+        metrics.save('data/reports/14346')
+
+     Attributes
+     ----------
+     enabled: bool
+        collect the metrics
+     prefix: str
+        prefix of the Prometheus metric names
+    """
+
+    logger = logging.getLogger(__name__)
+
+    _NULL_TIMER = nullcontext()
+
+    def __init__(self, enabled=True, prefix='elibrary'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.started = time.time()
+        self.counters = {}
+        self.observations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels) -> tuple:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self.observations.get(key)
+            if summary is None:
+                self.observations[key] = {'count': 1, 'sum': value, 'min': value, 'max': value}
+            else:
+                summary['count'] += 1
+                summary['sum'] += value
+                summary['min'] = min(summary['min'], value)
+                summary['max'] = max(summary['max'], value)
+
+    def timer(self, name, **labels):
+        """ Context manager that observes the seconds spent in its block """
+
+        if not self.enabled:
+            return self._NULL_TIMER
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def report(self) -> dict:
+        """ Run report: counters, and observations with their mean and rate per second of the observed time """
+
+        def entry(name, labels, values):
+            return {'name': name, 'labels': dict(labels), **values}
+
+        with self._lock:
+            counters = [entry(name, labels, {'value': value}) for (name, labels), value in sorted(self.counters.items())]
+            observations = []
+            for (name, labels), summary in sorted(self.observations.items()):
+                values = dict(summary, mean=summary['sum'] / summary['count'])
+                if name.endswith('_seconds'):
+                    values['per_second'] = summary['count'] / summary['sum'] if summary['sum'] > 0 else None
+                observations.append(entry(name, labels, values))
+        return {
+            'started': self.started,
+            'duration_seconds': time.time() - self.started,
+            'counters': counters,
+            'observations': observations,
+        }
+
+    def to_prometheus(self) -> str:
+        """ Counters as counters, observations as summaries with min and max gauges """
+
+        def escape(value):
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def labels_text(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels) + '}'
+
+        def number(value):
+            return repr(float(value)) if math.isfinite(value) else ('+Inf' if value > 0 else '-Inf')
+
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            observations = sorted((key, dict(summary)) for key, summary in self.observations.items())
+        for name in dict.fromkeys(name for (name, _), _ in counters):
+            metric = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {metric} counter')
+            lines += [f'{metric}{labels_text(labels)} {number(value)}'
+                      for (other, labels), value in counters if other == name]
+        for name in dict.fromkeys(name for (name, _), _ in observations):
+            metric = f'{self.prefix}_{name}'
+            summaries = [(labels_text(labels), summary) for (other, labels), summary in observations if other == name]
+            lines.append(f'# TYPE {metric} summary')
+            for text, summary in summaries:
+                lines += [f'{metric}_count{text} {summary["count"]}', f'{metric}_sum{text} {number(summary["sum"])}']
+            for statistic in ('min', 'max'):
+                lines.append(f'# TYPE {metric}_{statistic} gauge')
+                lines += [f'{metric}_{statistic}{text} {number(summary[statistic])}' for text, summary in summaries]
+        return '\n'.join(lines) + '\n'
+
+    def save(self, directory):
+        """ Write metrics.json and metrics.prom to the directory """
+
+        if not self.enabled:
+            return
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / 'metrics.json', 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=2)
+        with open(directory / 'metrics.prom', 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus())
+        self.logger.info(f"Run metrics saved to: {directory}")
+
+
+# Default of the pipeline classes: instrumentation is off unless a Metrics instance is passed
+DISABLED = Metrics(enabled=False)
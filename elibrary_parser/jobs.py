@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+from .logging_config import setup_logging
+
+
+def _timed_call(function, org_id, profile):
+    start = time.perf_counter()
+    result = function(org_id, profile)
+    return result or {}, time.perf_counter() - start
+
+
+class Stage:
+    """ One step of the pipeline, run as a separate job for every organization
+
+     Attributes
+     ----------
+     function: callable
+        function(org_id, profile) -> dict, e.g. {'items': number of processed publications};
+        a top-level function, so it can be sent to a worker process
+     concurrency: int
+        maximal number of jobs of the stage running at once
+     executor: str
+        'thread' for interactive and I/O-bound stages, 'process' for CPU-bound ones
+     params: tuple
+        profile keys the result of the stage depends on
+    """
+
+    def __init__(self, name, function, concurrency=1, executor='process', params=()):
+        self.name = name
+        self.function = function
+        self.concurrency = concurrency
+        self.executor = executor
+        self.params = tuple(params)
+
+    def params_hash(self, profile) -> str:
+        params = {key: profile.get(key) for key in self.params}
+        return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+class JobState:
+    """ Status of every (organization, stage) job in a JSON file
+
+    The file is rewritten after every change through a temporary file and a
+    rename, so an interrupted run leaves the last consistent state.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.jobs = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as file:
+                self.jobs = json.load(file)
+
+    def get(self, org_id, stage) -> dict:
+        return self.jobs.get(str(org_id), {}).get(stage, {})
+
+    def update(self, org_id, stage, **fields):
+        self.jobs.setdefault(str(org_id), {}).setdefault(stage, {}).update(fields)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(self.jobs, file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def is_done(self, org_id, stage, params_hash, previous=None) -> bool:
+        """ The stage is done with these parameters after the previous stage had been done """
+
+        job = self.get(org_id, stage)
+        if job.get('status') != 'done' or job.get('params') != params_hash:
+            return False
+        upstream = self.get(org_id, previous).get('finished') if previous else None
+        return upstream is None or job.get('finished', '') >= upstream
+
+
+class StageScheduler:
+    """ Runs the stages of every organization in order on per-stage worker pools
+
+    Every stage has its own executor, so e.g. one browser downloads while
+    several processes parse the pages of organizations downloaded before.
+    A stage is skipped when the state has it done with the same parameters
+    and after the previous stage, and no previous stage has run in this run.
+    The first failed stage stops its organization, the others go on.
+
+     Attributes
+     ----------
+     stages: list
+        Stage objects in the order of the pipeline
+     state: JobState
+        persisted job statuses
+     force: bool
+        run every stage, whatever the state says
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, stages, state: JobState, force=False):
+        self.stages = list(stages)
+        self.state = state
+        self.force = force
+
+    @staticmethod
+    def executor(stage):
+        if stage.executor == 'thread':
+            return ThreadPoolExecutor(max_workers=stage.concurrency)
+        # Forking while a download thread drives the browser could copy its held locks into the workers.
+        # Spawned workers start with fresh logging, so they get the logging of this process if it has any
+        root = logging.getLogger()
+        return ProcessPoolExecutor(
+            max_workers=stage.concurrency,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=setup_logging if root.handlers else None,
+            initargs=(root.level,) if root.handlers else (),
+        )
+
+    def run(self, profiles) -> dict:
+        """ Run the pipeline for {org_id: profile} and return the throughput report """
+
+        executors = {stage.name: self.executor(stage) for stage in self.stages}
+        totals = {stage.name: {'run': 0, 'skipped': 0, 'failed': 0, 'seconds': 0.0, 'items': 0}
+                  for stage in self.stages}
+        futures = {}
+        completed = []
+        start = time.perf_counter()
+
+        def submit(org_id, index, rerun):
+            # The first stage of the organization that has to run is submitted, done stages before it are skipped
+            for position in range(index, len(self.stages)):
+                stage = self.stages[position]
+                params_hash = stage.params_hash(profiles[org_id])
+                previous = self.stages[position - 1].name if position else None
+                if not (self.force or rerun) and self.state.is_done(org_id, stage.name, params_hash, previous):
+                    self.logger.info(f"Organization {org_id}: {stage.name} is done, skipped")
+                    totals[stage.name]['skipped'] += 1
+                    continue
+                self.state.update(org_id, stage.name, status='queued', params=params_hash, error=None)
+                future = executors[stage.name].submit(_timed_call, stage.function, org_id, profiles[org_id])
+                futures[future] = (org_id, position)
+                return
+            completed.append(org_id)
+
+        try:
+            for org_id in profiles:
+                submit(org_id, 0, rerun=False)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    org_id, position = futures.pop(future)
+                    stage = self.stages[position]
+                    try:
+                        result, seconds = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Organization {org_id}: {stage.name} failed: {e!r}")
+                        totals[stage.name]['failed'] += 1
+                        self.state.update(org_id, stage.name, status='failed', error=repr(e),
+                                          finished=datetime.now().isoformat(timespec='seconds'))
+                        continue
+                    self.logger.info(f"Organization {org_id}: {stage.name} done in {seconds:.1f} s")
+                    totals[stage.name]['run'] += 1
+                    totals[stage.name]['seconds'] += seconds
+                    totals[stage.name]['items'] += result.get('items', 0)
+                    self.state.update(org_id, stage.name, status='done', seconds=round(seconds, 3), result=result,
+                                      finished=datetime.now().isoformat(timespec='seconds'))
+                    submit(org_id, position + 1, rerun=True)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.perf_counter() - start
+        return {
+            'organizations': len(profiles),
+            'completed': len(completed),
+            'seconds': elapsed,
+            'organizations_per_hour': len(completed) / elapsed * 3600 if elapsed > 0 else None,
+            'stages': {
+                name: dict(stage_totals, items_per_second=stage_totals['items'] / stage_totals['seconds']
+                           if stage_totals['seconds'] > 0 else None)
+                for name, stage_totals in totals.items()
+            },
+        }
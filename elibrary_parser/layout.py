@@ -0,0 +1,216 @@
+import logging
+
+import numpy as np
+from scipy import fft, sparse
+from scipy.sparse import csgraph
+
+
+class ForceLayout:
+    """ Fruchterman-Reingold layout with grid-approximated repulsion
+
+    Repulsion is computed with a particle-mesh scheme: node masses are spread
+    over a regular grid (cloud-in-cell), convolved with the 1/d repulsion
+    kernel by FFT and interpolated back to the nodes. An iteration costs
+    O(n + G^2 log G) instead of O(n^2). Attraction along links, gravity
+    towards the centre and the cooling schedule are vectorized over all nodes.
+
+     Attributes
+     ----------
+     iterations: int
+        number of iterations for a layout from scratch
+     warm_iterations: int
+        number of iterations when previous coordinates are given
+     gravity: float
+        strength of the pull towards the centre, keeps components together
+     grid_size: int
+        grid resolution, chosen from the number of nodes when None
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, iterations=150, warm_iterations=30, gravity=1.0, grid_size=None, seed=0):
+        self.iterations = iterations
+        self.warm_iterations = warm_iterations
+        self.gravity = gravity
+        self.grid_size = grid_size
+        self.seed = seed
+        self._kernels = {}
+
+    def fit(self, adjacency, initial=None) -> np.ndarray:
+        """ Compute node positions
+
+        Connected components other than the largest one drift far away under
+        repulsion, so after the simulation they are packed on rings around it.
+        With a warm start, only components without any previous coordinates
+        are packed, the others stay where the simulation put them.
+
+        :param adjacency: symmetric sparse matrix of link weights
+        :param initial: (n, 2) previous coordinates, NaN for new nodes
+        :return: (n, 2) array of coordinates
+        """
+
+        n = adjacency.shape[0]
+        adjacency = sparse.csr_matrix(adjacency)
+        initial = np.full((n, 2), np.nan) if initial is None else np.asarray(initial, dtype=float)
+        if n == 0:
+            return initial
+
+        connected = np.diff(adjacency.indptr) > 0
+        pos = np.array(initial)
+        if connected.any():
+            pos[connected] = self._simulate(adjacency[connected][:, connected], initial[connected])
+
+        pos[np.isnan(pos)] = 0.0
+
+        _, components = csgraph.connected_components(adjacency, directed=False)
+        sizes = np.bincount(components)
+        known = ~np.isnan(initial).any(axis=1)
+        if known.any():
+            fixed = np.bincount(components, weights=known, minlength=len(sizes)) > 0
+        else:
+            fixed = np.arange(len(sizes)) == sizes.argmax()
+        self._pack_components(pos, components, fixed)
+        return pos
+
+    def _simulate(self, adjacency, initial) -> np.ndarray:
+        n = adjacency.shape[0]
+        rng = np.random.default_rng(self.seed)
+
+        upper = sparse.triu(adjacency, k=1).tocoo()
+        src, dst = upper.row, upper.col
+        weight = upper.data / upper.data.mean()
+        endpoints = np.concatenate([src, dst])
+
+        # With unit ideal distance the layout occupies a square of side ~sqrt(n)
+        side = np.sqrt(n)
+        warm = not np.isnan(initial).all()
+        if warm:
+            pos = self._warm_start(adjacency, initial, rng)
+            iterations = self.warm_iterations
+            temperature = 0.02 * side
+        else:
+            pos = (rng.random((n, 2)) - 0.5) * side
+            iterations = self.iterations
+            temperature = 0.1 * side
+
+        for step in range(iterations):
+            force = self._repulsion(pos)
+
+            delta = pos[src] - pos[dst]
+            distance = np.sqrt((delta ** 2).sum(axis=1))
+            pull = delta * (weight * distance)[:, None]
+            for axis in range(2):
+                force[:, axis] += np.bincount(
+                    endpoints, weights=np.concatenate([-pull[:, axis], pull[:, axis]]), minlength=n
+                )
+
+            force -= self.gravity * pos
+
+            length = np.sqrt((force ** 2).sum(axis=1)) + 1e-9
+            limit = temperature * (1 - step / iterations)
+            pos += force * (np.minimum(length, limit) / length)[:, None]
+
+        self.logger.info(f"Laid out {n} nodes in {iterations} iterations ({'warm' if warm else 'cold'} start)")
+        return pos
+
+    @staticmethod
+    def _pack_components(pos, components, fixed):
+        """ Move the components that are not fixed onto rings around the fixed ones,
+        largest first, keeping the shape of every component """
+
+        order = np.argsort(components, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(components))]
+        members = [order[bounds[c]:bounds[c + 1]] for c in range(len(bounds) - 1)]
+        movable = [c for c in np.argsort(-np.diff(bounds), kind='stable') if not fixed[c]]
+        if not movable:
+            return
+
+        anchored = np.concatenate([members[c] for c in np.flatnonzero(fixed)] or [np.zeros(0, dtype=int)])
+        if len(anchored):
+            centre = pos[anchored].mean(axis=0)
+            ring = np.sqrt(((pos[anchored] - centre) ** 2).sum(axis=1)).max() + 1
+        else:
+            centre, ring = np.zeros(2), 0.0
+
+        angle, ring_width = 0.0, 0.0
+        for c in movable:
+            nodes = members[c]
+            own_centre = pos[nodes].mean(axis=0)
+            radius = np.sqrt(((pos[nodes] - own_centre) ** 2).sum(axis=1)).max() + 0.5
+            step = (2 * radius + 1) / max(ring + radius, 1)
+            if angle + step > 2 * np.pi:
+                ring += ring_width + 1
+                angle, ring_width = 0.0, 0.0
+            ring_width = max(ring_width, 2 * radius)
+            target = ring + radius
+            angle += step / 2
+            pos[nodes] += centre + target * np.array([np.cos(angle), np.sin(angle)]) - own_centre
+            angle += step / 2
+
+    def _warm_start(self, adjacency, initial, rng) -> np.ndarray:
+        """ Keep known coordinates, put new nodes at the mean of their known neighbours """
+
+        pos = np.array(initial)
+        known = ~np.isnan(pos).any(axis=1)
+        if known.all():
+            return pos
+
+        connection = sparse.csr_matrix(adjacency, dtype=float)
+        connection.data[:] = 1.0
+        known_pos = np.where(known[:, None], pos, 0.0)
+        neighbours = connection @ known.astype(float)
+        neighbour_sum = connection @ known_pos
+        centre = pos[known].mean(axis=0)
+        spread = pos[known].std(axis=0).mean() if known.sum() > 1 else 1.0
+
+        new = ~known
+        placed = new & (neighbours > 0)
+        pos[placed] = neighbour_sum[placed] / neighbours[placed][:, None]
+        pos[new & ~placed] = centre + (rng.random(((new & ~placed).sum(), 2)) - 0.5) * spread
+        pos[new] += (rng.random((new.sum(), 2)) - 0.5) * 0.5
+        return pos
+
+    def _kernel(self, padded):
+        """ FFT of the 1/d repulsion kernel on a (padded, padded) periodic grid """
+
+        if padded not in self._kernels:
+            offsets = np.fft.fftfreq(padded, 1 / padded)
+            dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+            d2 = dx ** 2 + dy ** 2
+            d2[0, 0] = 1.0
+            kx, ky = dx / d2, dy / d2
+            kx[0, 0] = ky[0, 0] = 0.0
+            self._kernels[padded] = (fft.rfft2(kx), fft.rfft2(ky))
+        return self._kernels[padded]
+
+    def _repulsion(self, pos) -> np.ndarray:
+        n = len(pos)
+        size = self.grid_size or int(np.clip(np.sqrt(n), 32, 256))
+        low = pos.min(axis=0)
+        cell = max((pos.max(axis=0) - low).max(), 1e-9) / (size - 1)
+
+        grid = (pos - low) / cell
+        corner = np.clip(np.floor(grid).astype(np.int64), 0, size - 2)
+        frac = grid - corner
+        cells = []
+        weights = []
+        for ox, oy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            cells.append((corner[:, 0] + ox) * size + corner[:, 1] + oy)
+            wx = frac[:, 0] if ox else 1 - frac[:, 0]
+            wy = frac[:, 1] if oy else 1 - frac[:, 1]
+            weights.append(wx * wy)
+
+        mass = np.bincount(np.concatenate(cells), weights=np.concatenate(weights), minlength=size * size)
+        # Zero padding to at least 2*size - 1 keeps the circular convolution from wrapping around
+        padded = fft.next_fast_len(2 * size - 1, real=True)
+        mass_hat = fft.rfft2(mass.reshape(size, size), s=(padded, padded), workers=-1)
+        kx_hat, ky_hat = self._kernel(padded)
+        # Kernel is in grid units, scale to coordinate units (k^2 / d with k = 1)
+        field_x = fft.irfft2(mass_hat * kx_hat, s=(padded, padded), workers=-1)[:size, :size].ravel() / cell
+        field_y = fft.irfft2(mass_hat * ky_hat, s=(padded, padded), workers=-1)[:size, :size].ravel() / cell
+
+        force = np.zeros((n, 2))
+        for index, weight in zip(cells, weights):
+            force[:, 0] += weight * field_x[index]
+            force[:, 1] += weight * field_y[index]
+        return force
@@ -1,6 +1,14 @@
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='[%(asctime)s] [%(levelname)s] %(message)s'
-)
\ No newline at end of file
+LOG_FORMAT = '[%(asctime)s] [%(levelname)s] %(message)s'
+
+
+def setup_logging(level=logging.INFO):
+    """ Log to stderr with the time and level of every message
+
+    Called by the scripts, not on import: a program that imports the package
+    keeps its own logging configuration. Does nothing if the root logger
+    already has handlers.
+    """
+
+    logging.basicConfig(level=level, format=LOG_FORMAT)
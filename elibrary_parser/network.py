@@ -0,0 +1,219 @@
+import logging
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .author_metrics import AuthorMetrics
+from .authors import author_mentions, load_thesaurus
+from .layout import ForceLayout
+
+
+class CoauthorshipNetworkBuilder:
+    """ Builds the co-authorship network in VOSviewer map/network format
+
+    Authors are taken from processed publications.csv and merged with the
+    author thesaurus. All link and node weights come from sparse products of
+    the author x publication incidence matrix.
+
+     Attributes
+     ----------
+     min_documents: int
+        authors with fewer publications are left out of the network
+     max_authors: int
+        publications with more authors are ignored, as in VOSviewer
+     resolution: float
+        resolution of the modularity-based clustering
+     layout: ForceLayout
+        layout engine for the x/y coordinates
+     warm_start: bool
+        start the layout from the coordinates of the existing map.txt
+     metrics: AuthorMetrics
+        per-author weight and score columns
+    """
+
+    logger = logging.getLogger(__name__)
+
+    MAP_COLUMNS = [
+        'id', 'label', 'x', 'y', 'cluster', 'weight<Links>', 'weight<Total link strength>',
+    ] + AuthorMetrics.MAP_COLUMNS
+
+    def __init__(self, org_id, data_path='data/', min_documents=1, max_authors=25, resolution=1.0, seed=0,
+                 layout=None, warm_start=True, metrics=None):
+        self.org_id = org_id
+        self.data_path = Path(data_path)
+        self.files_dir = self.data_path / 'processed' / self.org_id
+        self.min_documents = min_documents
+        self.max_authors = max_authors
+        self.resolution = resolution
+        self.seed = seed
+        self.layout = layout or ForceLayout(seed=seed)
+        self.warm_start = warm_start
+        self.metrics = metrics or AuthorMetrics()
+
+    def load_authorship(self):
+        """ Long table of (publication, author) pairs and the publication table """
+
+        publications = pd.read_csv(self.files_dir / 'publications.csv')
+        replace_dict = load_thesaurus(self.files_dir / 'thesaurus_authors.txt')
+
+        authorship = author_mentions(publications['Authors'], replace_dict).drop_duplicates()
+        n_authors = authorship.groupby('publication')['author'].transform('size')
+        authorship = authorship[n_authors <= self.max_authors]
+        self.logger.info(f"Loaded {len(authorship)} authorships from {len(publications)} publications")
+        return authorship, publications
+
+    def incidence_matrix(self, authorship, n_publications):
+        """ Binary author x publication matrix and author labels """
+
+        codes, labels = pd.factorize(authorship['author'], sort=True)
+        incidence = sparse.csr_matrix(
+            (np.ones(len(codes), dtype=np.int32), (codes, authorship['publication'].to_numpy())),
+            shape=(len(labels), n_publications)
+        )
+        return incidence, np.asarray(labels)
+
+    def build(self):
+        """ Compute nodes and links of the network
+
+        :return: (nodes DataFrame in map.txt schema, links DataFrame in network.txt schema)
+        """
+
+        authorship, publications = self.load_authorship()
+        incidence, labels = self.incidence_matrix(authorship, len(publications))
+
+        documents = np.asarray(incidence.sum(axis=1)).ravel()
+        keep = documents >= self.min_documents
+        incidence, labels = incidence[keep], labels[keep]
+        metrics = self.metrics.compute(authorship, publications).reindex(labels)
+        yearly = self.metrics.yearly_output(authorship, publications).reindex(labels, fill_value=0)
+
+        cooccurrence = (incidence @ incidence.T).tocsr()
+        cooccurrence.setdiag(0)
+        cooccurrence.eliminate_zeros()
+        links = np.diff(cooccurrence.indptr)
+        total_link_strength = np.asarray(cooccurrence.sum(axis=1)).ravel()
+
+        clusters = self.detect_clusters(cooccurrence)
+        x, y = self.layout.fit(cooccurrence, self.previous_coordinates(labels)).T
+
+        nodes = pd.DataFrame({
+            'id': np.arange(1, len(labels) + 1),
+            'label': labels,
+            'x': x,
+            'y': y,
+            'cluster': clusters,
+            'weight<Links>': links,
+            'weight<Total link strength>': total_link_strength,
+        })
+        nodes = nodes.join(metrics, on='label').join(yearly, on='label')
+
+        upper = sparse.triu(cooccurrence, k=1).tocoo()
+        edges = pd.DataFrame({
+            'first_author': upper.row + 1,
+            'second_author': upper.col + 1,
+            'weight': upper.data,
+        })
+        self.logger.info(f"Built network with {len(nodes)} authors and {len(edges)} links")
+        return nodes, edges
+
+    def detect_clusters(self, cooccurrence, max_iter=100) -> np.ndarray:
+        """ Modularity-based label propagation (LPAm), clusters numbered from 1
+        in descending order of size
+
+        Every iteration scores all (author, neighbouring cluster) pairs at once:
+        the link weight to the cluster minus the expected weight under the
+        configuration model. A random half of the authors that prefer another
+        cluster move to it, which keeps the synchronous updates from oscillating.
+        """
+
+        n = cooccurrence.shape[0]
+        coo = cooccurrence.tocoo()
+        degree = np.bincount(coo.row, weights=coo.data, minlength=n)
+        two_m = degree.sum()
+        labels = np.arange(n)
+        if two_m == 0:
+            return labels + 1
+
+        rng = np.random.default_rng(self.seed)
+        # Every author is also a candidate for its own cluster with zero link weight
+        rows = np.concatenate([coo.row, np.arange(n)])
+        cols = np.concatenate([coo.col, np.arange(n)])
+        weights = np.concatenate([coo.data.astype(float), np.zeros(n)])
+        for _ in range(max_iter):
+            volume = np.bincount(labels, weights=degree, minlength=n)
+            keys, inverse = np.unique(rows * n + labels[cols], return_inverse=True)
+            link = np.bincount(inverse, weights=weights)
+            node, label = np.divmod(keys, n)
+            own = label == labels[node]
+            score = link - self.resolution * degree[node] * (volume[label] - own * degree[node]) / two_m
+            score += rng.random(len(score)) * 1e-9
+
+            order = np.lexsort((-score, node))
+            first = order[np.r_[True, node[order][1:] != node[order][:-1]]]
+            best = labels.copy()
+            best[node[first]] = label[first]
+
+            changed = best != labels
+            labels = np.where(changed & (rng.random(n) < 0.5), best, labels)
+            if changed.sum() <= n * 1e-3:
+                break
+
+        _, labels, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+        rank = np.empty_like(sizes)
+        rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+        return rank[labels] + 1
+
+    def previous_coordinates(self, labels) -> np.ndarray:
+        """ Coordinates of the authors from the existing map.txt, NaN for new authors """
+
+        map_path = self.files_dir / 'map.txt'
+        if not self.warm_start or not map_path.exists():
+            return None
+        previous = pd.read_csv(map_path, sep='\t', usecols=['label', 'x', 'y']).drop_duplicates('label')
+        coordinates = previous.set_index('label').reindex(labels)[['x', 'y']].to_numpy(dtype=float)
+        self.logger.info(f"Warm start from {map_path}: {(~np.isnan(coordinates[:, 0])).sum()} known authors")
+        return coordinates
+
+    def refresh_metrics(self):
+        """ Recompute the metric columns of the existing map.txt without
+        touching the links, clusters and coordinates """
+
+        authorship, publications = self.load_authorship()
+        map_path = self.files_dir / 'map.txt'
+        nodes = pd.read_csv(map_path, sep='\t')
+        nodes = nodes[['id', 'label', 'x', 'y', 'cluster', 'weight<Links>', 'weight<Total link strength>']]
+        metrics = self.metrics.compute(authorship, publications)
+        yearly = self.metrics.yearly_output(authorship, publications)
+        # Authors of the map may be gone from the publications, e.g. after a thesaurus change;
+        # their links stay in network.txt, so they are kept with zero metrics
+        missing = ~nodes['label'].isin(metrics.index)
+        if missing.any():
+            self.logger.warning(f"{missing.sum()} authors of {map_path} have no publications, their metrics are set to 0")
+        nodes = nodes.join(metrics.reindex(nodes['label'], fill_value=0), on='label')
+        nodes = nodes.join(yearly.reindex(nodes['label'], fill_value=0), on='label')
+        self.save_map(nodes)
+        self.save_author_metrics(nodes)
+
+    def save_map(self, nodes):
+        self.files_dir.mkdir(exist_ok=True, parents=True)
+        map_path = self.files_dir / 'map.txt'
+        nodes[self.MAP_COLUMNS].to_csv(map_path, sep='\t', index=False)
+        self.logger.info(f"Map for organization {self.org_id} saved to: {map_path}")
+
+    def save_author_metrics(self, nodes):
+        """ h-index and yearly output of the network authors """
+
+        metrics_path = self.files_dir / 'author_metrics.txt'
+        yearly_columns = [column for column in nodes.columns if column.startswith('documents<')]
+        nodes[['id', 'label', 'h-index'] + yearly_columns].to_csv(metrics_path, sep='\t', index=False)
+        self.logger.info(f"Author metrics for organization {self.org_id} saved to: {metrics_path}")
+
+    def save(self, nodes, edges):
+        self.save_map(nodes)
+        self.save_author_metrics(nodes)
+        network_path = self.files_dir / 'network.txt'
+        edges.to_csv(network_path, sep='\t', index=False, header=False)
+        self.logger.info(f"Network for organization {self.org_id} saved to: {network_path}")
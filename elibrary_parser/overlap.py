@@ -0,0 +1,159 @@
+import csv
+import logging
+
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from .types import Publication
+
+# Bits per machine word when unpacking organization bitmasks
+_WORD_BITS = 62
+
+
+class PublicationOverlap:
+    """ Co-publication analysis between organizations
+
+    Every publication is keyed by its canonical id and mapped to a bitmask of
+    the organizations that published it. Pairwise and N-way overlaps are
+    computed from the distinct bitmasks, so the cost of a matrix depends on
+    the number of membership patterns rather than on the number of
+    publications.
+
+     Attributes
+     ----------
+     org_ids: list
+        organizations in the order of their bits
+     index: dict
+        canonical publication id -> organization bitmask
+     publications: dict
+        canonical publication id -> first seen Publication
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self):
+        self.org_ids = []
+        self.index = {}
+        self.publications = {}
+        self._org_bits = {}
+        self._pattern_counts = None
+
+    @classmethod
+    def from_publications(cls, publications_by_org: dict) -> 'PublicationOverlap':
+        overlap = cls()
+        for org_id, publications in publications_by_org.items():
+            overlap.add_organization(org_id, publications)
+        return overlap
+
+    @classmethod
+    def from_csv(cls, org_ids, data_path='data/') -> 'PublicationOverlap':
+        """ Build the index from processed publications.csv files """
+
+        overlap = cls()
+        for org_id in org_ids:
+            csv_path = Path(data_path) / 'processed' / str(org_id) / 'publications.csv'
+            overlap.add_organization(org_id, cls.read_publications(csv_path))
+        return overlap
+
+    @staticmethod
+    def read_publications(csv_path):
+        with open(csv_path, 'r', encoding='utf-8', newline='') as csvfile:
+            for row in csv.DictReader(csvfile):
+                pub = Publication(
+                    title=row['Title'],
+                    authors=row['Authors'],
+                    info=row['Source title'],
+                    link=row['Link'],
+                    cited_by=row['Cited by'],
+                    source_id=row['Source ID']
+                )
+                pub.year = row['Year']
+                yield pub
+
+    def add_organization(self, org_id, publications):
+        if org_id not in self._org_bits:
+            self._org_bits[org_id] = len(self.org_ids)
+            self.org_ids.append(org_id)
+        bit = 1 << self._org_bits[org_id]
+
+        index = self.index
+        known = self.publications
+        added = skipped = 0
+        for pub in publications:
+            pub_id = pub.canonical_id
+            # Without an item id and a title publications of different organizations cannot be matched
+            if pub_id is None:
+                skipped += 1
+                continue
+            index[pub_id] = index.get(pub_id, 0) | bit
+            if pub_id not in known:
+                known[pub_id] = pub
+            added += 1
+        self._pattern_counts = None
+        self.logger.info(f"Indexed {added} publications of organization {org_id}, "
+                         f"skipped {skipped} without an item id and a title")
+
+    def _mask(self, org_ids) -> int:
+        mask = 0
+        for org_id in org_ids:
+            mask |= 1 << self._org_bits[org_id]
+        return mask
+
+    def pattern_counts(self) -> Counter:
+        """ Number of publications for every distinct organization bitmask """
+
+        if self._pattern_counts is None:
+            self._pattern_counts = Counter(self.index.values())
+        return self._pattern_counts
+
+    def _membership(self):
+        """ Dense (patterns x organizations) 0/1 matrix and pattern counts """
+
+        counts = self.pattern_counts()
+        masks = list(counts.keys())
+        n_orgs = len(self.org_ids)
+        membership = np.zeros((len(masks), n_orgs), dtype=np.int64)
+        word_mask = (1 << _WORD_BITS) - 1
+        for start in range(0, n_orgs, _WORD_BITS):
+            width = min(_WORD_BITS, n_orgs - start)
+            words = np.fromiter(((m >> start) & word_mask for m in masks), dtype=np.int64, count=len(masks))
+            shifts = np.arange(width, dtype=np.int64)
+            membership[:, start:start + width] = (words[:, None] >> shifts) & 1
+        weights = np.fromiter(counts.values(), dtype=np.int64, count=len(masks))
+        return membership, weights
+
+    def pairwise_matrix(self) -> np.ndarray:
+        """ Symmetric matrix of shared publication counts between organizations,
+        the diagonal holds the number of publications of each organization """
+
+        membership, weights = self._membership()
+        return (membership * weights[:, None]).T @ membership
+
+    def overlap(self, *org_ids) -> int:
+        """ Number of publications shared by all given organizations """
+
+        required = self._mask(org_ids)
+        return sum(count for mask, count in self.pattern_counts().items() if mask & required == required)
+
+    def combinations(self, min_size: int = 2) -> dict:
+        """ Number of publications per exact group of co-publishing organizations
+
+        :param min_size: smallest group size to report
+        :return: {tuple of org ids: number of publications}
+        """
+
+        groups = {}
+        for mask, count in self.pattern_counts().items():
+            if bin(mask).count('1') < min_size:
+                continue
+            group = tuple(org_id for org_id, bit in self._org_bits.items() if mask >> bit & 1)
+            groups[group] = count
+        return dict(sorted(groups.items(), key=lambda item: item[1], reverse=True))
+
+    def common_publications(self, *org_ids) -> list:
+        """ Publications shared by all given organizations """
+
+        required = self._mask(org_ids)
+        return [self.publications[pub_id] for pub_id, mask in self.index.items() if mask & required == required]
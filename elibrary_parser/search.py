@@ -0,0 +1,58 @@
+import re
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+
+from .authors import to_cyrillic, to_latin
+
+
+class AuthorSearchIndex:
+    """ Fuzzy, transliteration-aware search over author labels
+
+    Labels and queries are brought to one latin spelling: cyrillic is
+    transliterated, latin goes to cyrillic and back, so 'Иванов', 'ivanov'
+    and 'iwanow' all become 'ivanov'. Matches are ranked by tier (prefix,
+    substring, trigram similarity only), then by the Jaccard similarity of
+    the character trigrams, then by the node weight. Trigram overlaps are
+    one sparse product with the label x trigram matrix, built once.
+
+     Attributes
+     ----------
+     min_similarity: float
+        minimal trigram similarity of a match that is not a substring
+    """
+
+    def __init__(self, labels, weights=None, min_similarity=0.3):
+        self.labels = np.asarray(labels, dtype=object)
+        self.weights = np.zeros(len(self.labels)) if weights is None else np.asarray(weights, dtype=float)
+        self.min_similarity = min_similarity
+        self.keys = pd.Series([self.normalize(label) for label in self.labels], dtype=object)
+        self.vectorizer = CountVectorizer(analyzer='char_wb', ngram_range=(3, 3), binary=True)
+        self.matrix = self.vectorizer.fit_transform(self.keys).tocsr()
+        self.trigram_counts = np.asarray(self.matrix.sum(axis=1)).ravel()
+
+    @staticmethod
+    def normalize(text) -> str:
+        text = to_latin(to_cyrillic(to_latin(str(text).lower())))
+        return re.sub(r'\s+', ' ', re.sub(r"[^a-z. ]", '', text)).strip()
+
+    def search(self, query, limit=10) -> list:
+        """ Best matches as (node position, tier, similarity), best first """
+
+        key = self.normalize(query)
+        if not key:
+            return []
+        prefix = self.keys.str.startswith(key).to_numpy()
+        substring = self.keys.str.contains(key, regex=False).to_numpy()
+
+        query_vector = self.vectorizer.transform([key])
+        shared = np.asarray((self.matrix @ query_vector.T).todense()).ravel()
+        union = self.trigram_counts + query_vector.nnz - shared
+        similarity = np.divide(shared, union, out=np.zeros(len(shared)), where=union > 0)
+
+        tier = np.where(prefix, 0, np.where(substring, 1, 2))
+        candidates = np.flatnonzero((tier < 2) | (similarity >= self.min_similarity))
+        order = np.lexsort((-self.weights[candidates], -similarity[candidates], tier[candidates]))
+        best = candidates[order[:limit]]
+        return [(int(node), int(tier[node]), float(similarity[node])) for node in best]
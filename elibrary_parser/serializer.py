@@ -1,16 +1,20 @@
 import csv
 import logging
+import os
+import tempfile
 
 from pathlib import Path
-from elibrary_parser.types import Publication
+from elibrary_parser.instrumentation import DISABLED
+from elibrary_parser.types import ITEM_ID_PATTERN, Publication
 
 class PublicationSerializer:
     
     logger = logging.getLogger(__name__)
-    def __init__(self, org_id, data_path = 'data/'):
+    def __init__(self, org_id, data_path = 'data/', metrics=None):
         self.org_id = org_id
         self.data_path = Path(data_path)
         self.files_dir = None
+        self.metrics = metrics or DISABLED
         
         self.create_processed_dir()
         
@@ -22,7 +26,8 @@ class PublicationSerializer:
         output_dir.mkdir(exist_ok=True)
         csv_path = output_dir/ 'publications.csv'
         
-        with open(csv_path, 'w', encoding='utf-8', newline='') as csvfile:
+        with open(csv_path, 'w', encoding='utf-8', newline='') as csvfile, \
+                self.metrics.timer('serializer_write_seconds'):
             writer = csv.writer(csvfile, delimiter=',')
             writer.writerow(["Authors", "Title", "Year", "Source title", "Cited by", "Link", "Source ID"])
             for pub in publications:
@@ -35,5 +40,62 @@ class PublicationSerializer:
                     pub.link,
                     pub.source_id
                 ])
+            self.metrics.count('serializer_rows_total', len(publications))
             self.logger.info(f"Publications for organization {self.org_id} saved to: {csv_path}")
-            
\ No newline at end of file
+            
+        if self.metrics.enabled:
+            self.metrics.count('serializer_bytes_total', csv_path.stat().st_size)
+
+    def update_citations(self, citations: dict) -> dict:
+        """ Replace the citation counts in the saved publications.csv
+
+        :param citations: {item id: number of citations}, e.g. from ElibraryHTMLParser.parse_citations
+        :return: numbers of updated rows, rows missing from the citations and citations of unknown publications
+        """
+
+        csv_path = self.data_path / 'processed' / self.org_id / 'publications.csv'
+        with open(csv_path, encoding='utf-8', newline='') as csvfile:
+            rows = list(csv.reader(csvfile))
+        header, rows = rows[0], rows[1:]
+        cited_by, link = header.index('Cited by'), header.index('Link')
+
+        updated = missing = 0
+        known = set()
+        for row in rows:
+            match = ITEM_ID_PATTERN.search(row[link])
+            # Publications without an eLibrary item are not in the listing either
+            if match is None:
+                continue
+            item_id = match.group(1)
+            known.add(item_id)
+            if item_id not in citations:
+                missing += 1
+            elif row[cited_by] != citations[item_id]:
+                row[cited_by] = citations[item_id]
+                updated += 1
+
+        # An unchanged table keeps its modification time, so the dashboard caches stay valid.
+        # A changed one is written to a temporary file and renamed, so readers never see it half-written
+        if updated:
+            with self.metrics.timer('serializer_write_seconds'):
+                fd, temp_path = tempfile.mkstemp(dir=csv_path.parent, suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as csvfile:
+                        writer = csv.writer(csvfile, delimiter=',')
+                        writer.writerow(header)
+                        writer.writerows(rows)
+                    # mkstemp creates the file readable by its owner only
+                    os.chmod(temp_path, csv_path.stat().st_mode)
+                    os.replace(temp_path, csv_path)
+                except BaseException:
+                    Path(temp_path).unlink(missing_ok=True)
+                    raise
+            self.metrics.count('serializer_rows_total', len(rows))
+            if self.metrics.enabled:
+                self.metrics.count('serializer_bytes_total', csv_path.stat().st_size)
+
+        changes = {'updated': updated, 'missing': missing, 'unknown': len(citations.keys() - known)}
+        self.logger.info(f"Citations of organization {self.org_id} refreshed in {csv_path}: "
+                         f"{updated} updated, {missing} not found in the listing, "
+                         f"{changes['unknown']} publications are not in the table")
+        return changes
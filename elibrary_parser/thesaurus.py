@@ -0,0 +1,614 @@
+import json
+import logging
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+from .authors import AuthorNameNormalizer
+
+logger = logging.getLogger(__name__)
+
+# Rows of publications.csv read at once by count_authors
+CHUNKSIZE = 100_000
+
+
+class ThesaurusBuilder:
+    """ Finds spelling variants of the same author and assembles a thesaurus
+
+    Two names can only match when the first parts of their initials are
+    equal, so names are blocked by that key without losing any pair.
+    Similarities are computed as chunked sparse products of L2-normalized
+    TF-IDF vectors inside every block and only the pairs above the threshold
+    are kept, so memory grows with the number of candidate pairs instead of
+    n^2. Matching pairs are merged into clusters with a disjoint-set, the cost
+    of which is linear in the number of pairs.
+
+     Attributes
+     ----------
+     similarity_coefficient: float
+        minimal cosine similarity of the surnames
+     surname_diff: int
+        maximal difference of the surname lengths
+     block_by_surname_letter: bool
+        also block by the first letter of the surname; faster, but misses
+        variants with a typo in the first letter
+     chunk_pairs: int
+        maximal number of similarities computed in one sparse product
+     check_gender: bool
+        refuse pairs of a female (ending in 'a') and a male surname
+     n_jobs: int
+        number of worker processes for the similarity search
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, similarity_coefficient=0.8, surname_diff=3, ngram_range=(1, 2),
+                 block_by_surname_letter=False, chunk_pairs=2_000_000, check_gender=True, n_jobs=1):
+        self.similarity_coefficient = similarity_coefficient
+        self.surname_diff = surname_diff
+        self.ngram_range = ngram_range
+        self.block_by_surname_letter = block_by_surname_letter
+        self.chunk_pairs = chunk_pairs
+        self.check_gender = check_gender
+        self.n_jobs = n_jobs
+
+    def params(self) -> dict:
+        """ Parameters that change the thesaurus, kept in the index of a build """
+
+        return {
+            'similarity_coefficient': self.similarity_coefficient,
+            'surname_diff': self.surname_diff,
+            'ngram_range': list(self.ngram_range),
+            'block_by_surname_letter': self.block_by_surname_letter,
+            'check_gender': self.check_gender,
+        }
+
+    def block_keys(self, surnames, initials) -> np.ndarray:
+        keys = initials.str.split('.').str[0]
+        if self.block_by_surname_letter:
+            keys = keys + '|' + surnames.str[:1]
+        return pd.factorize(keys)[0]
+
+    def fit_vectorizer(self, surnames):
+        """ L2-normalized TF-IDF vectors of character n-grams of the surnames """
+
+        self.vectorizer = TfidfVectorizer(analyzer='char', ngram_range=self.ngram_range)
+        self.matrix = self.vectorizer.fit_transform(surnames).tocsr()
+        return self.matrix
+
+    @staticmethod
+    def name_features(surnames, initials) -> dict:
+        """ Per-name arrays used by the pair checks """
+
+        initial_codes, initial_values = pd.factorize(initials)
+        return {
+            'initial_codes': initial_codes,
+            'initial_values': np.asarray(initial_values, dtype=object),
+            'lengths': surnames.str.len().to_numpy(),
+            # Female surnames end with 'a', male and female variants are different people
+            'female': surnames.str.endswith('a').to_numpy(),
+        }
+
+    def block_tasks(self, keys, first_new=0) -> list:
+        """ Split every block into (rows, columns) tasks of about chunk_pairs
+        similarities, largest blocks first; columns are the names from first_new on """
+
+        order = np.argsort(keys, kind='stable')
+        blocks = np.split(order, np.flatnonzero(np.diff(keys[order])) + 1)
+        tasks = []
+        for block in sorted(blocks, key=len, reverse=True):
+            columns = block[block >= first_new]
+            if len(block) < 2 or not len(columns):
+                continue
+            chunk = max(1, self.chunk_pairs // len(columns))
+            for start in range(0, len(block), chunk):
+                tasks.append((block[start:start + chunk], columns))
+        return tasks
+
+    def match_task(self, matrix, features, rows, columns):
+        """ Pairs (i, j), i < j, of rows x columns that are similar and pass the checks """
+
+        similarity = (matrix[rows] @ matrix[columns].T).tocoo()
+        i, j = rows[similarity.row], columns[similarity.col]
+        keep = (i < j) & (similarity.data >= self.similarity_coefficient)
+        i, j, values = i[keep], j[keep], similarity.data[keep]
+        keep = self.filter_pairs(i, j, features)
+        return i[keep], j[keep], values[keep]
+
+    def matching_pairs(self, matrix, surnames, initials, first_new=0):
+        """ Matching pairs inside every block that involve a name from first_new on
+
+        Blocks are processed by n_jobs processes; the TF-IDF matrix and the
+        name features are handed to every worker once, at its start.
+
+        :return: (i, j, similarity) arrays sorted by i, then j
+        """
+
+        features = self.name_features(surnames, initials)
+        tasks = self.block_tasks(self.block_keys(surnames, initials), first_new)
+        progress = _Progress(self.logger, tasks)
+
+        results = []
+        if self.n_jobs == 1 or len(tasks) < 2:
+            for rows, columns in tasks:
+                results.append(self.match_task(matrix, features, rows, columns))
+                progress.done(rows, columns, results[-1])
+        else:
+            # A fresh builder with the thresholds only: this one may hold the fitted vectorizer and the matrix
+            worker_builder = ThesaurusBuilder(**self.params())
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                     initargs=(worker_builder, matrix, features)) as executor:
+                futures = {executor.submit(_match_in_worker, rows, columns): (rows, columns) for rows, columns in tasks}
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    progress.done(*futures[future], results[-1])
+        progress.finish()
+
+        if not results:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+        i, j, values = (np.concatenate(parts) for parts in zip(*results))
+        order = np.lexsort((j, i))
+        return i[order], j[order], values[order]
+
+    @staticmethod
+    def compatible_initials(initials1: str, initials2: str) -> bool:
+        """ Equal initials, or the shorter ones are the beginning of the longer ones """
+
+        first, second = initials1.split('.'), initials2.split('.')
+        if len(first) != len(second):
+            shorter, longer = sorted([first, second], key=len)
+            return shorter == longer[:len(shorter)]
+        return first == second
+
+    def filter_pairs(self, i, j, features):
+        """ Mask of the candidate pairs that pass the initials and surname checks """
+
+        if not len(i):
+            return np.zeros(0, dtype=bool)
+        codes, values = features['initial_codes'], features['initial_values']
+        pair_codes = np.stack([codes[i], codes[j]], axis=1)
+        unique_codes, inverse = np.unique(pair_codes, axis=0, return_inverse=True)
+        compatible = np.array([
+            self.compatible_initials(values[a], values[b]) for a, b in unique_codes
+        ], dtype=bool)[inverse.ravel()]
+
+        lengths, female = features['lengths'], features['female']
+        keep = compatible & (np.abs(lengths[i] - lengths[j]) <= self.surname_diff)
+        if self.check_gender:
+            keep &= female[i] == female[j]
+        return keep
+
+    def cluster(self, n, i, j, similarity, initials) -> np.ndarray:
+        """ Merge matching pairs into clusters, most similar pairs first
+
+        A merge is refused when the most complete initials of the two clusters
+        disagree, so 'ivanov i.i' and 'ivanov i.p' are not joined through 'ivanov i'.
+
+        :return: cluster root of every name
+        """
+
+        forest = DisjointSet(n)
+        longest = initials.tolist()
+        order = np.argsort(-similarity, kind='stable')
+        for first, second in zip(i[order].tolist(), j[order].tolist()):
+            root1, root2 = forest.find(first), forest.find(second)
+            if root1 == root2 or not self.compatible_initials(longest[root1], longest[root2]):
+                continue
+            root = forest.union(root1, root2)
+            longest[root] = max(longest[root1], longest[root2], key=lambda value: len(value.split('.')))
+        return np.array([forest.find(k) for k in range(n)], dtype=np.int64)
+
+    @staticmethod
+    def canonical_names(roots, counts) -> np.ndarray:
+        """ Index of the canonical name of every name: the most frequent one
+        in its cluster, the earliest one on ties """
+
+        n = len(roots)
+        order = np.lexsort((np.arange(n), -np.asarray(counts), roots))
+        first = order[np.r_[True, roots[order][1:] != roots[order][:-1]]]
+        canonical = np.empty(n, dtype=np.int64)
+        canonical[roots[first]] = first
+        return canonical[roots]
+
+    def build(self, authors, surnames, initials, counts=None) -> dict:
+        """ Thesaurus {variant: canonical spelling}
+
+        Matching pairs are merged transitively, the most frequent spelling of
+        every cluster (the earliest one on ties) becomes its canonical name.
+
+        :param authors: original author names
+        :param surnames: transliterated surnames
+        :param initials: transliterated initials separated by dots
+        :param counts: number of mentions of every name
+        """
+
+        authors = pd.Series(authors).reset_index(drop=True)
+        surnames = pd.Series(surnames).reset_index(drop=True)
+        initials = pd.Series(initials).reset_index(drop=True)
+        n = len(authors)
+        if n == 0:
+            return {}
+        counts = np.ones(n) if counts is None else np.asarray(counts)
+
+        i, j, similarity = self.matching_pairs(self.fit_vectorizer(surnames), surnames, initials)
+        roots = self.cluster(n, i, j, similarity, initials)
+        canonical = self.canonical_names(roots, counts)
+
+        names = authors.to_numpy()
+        variants = np.flatnonzero(canonical != np.arange(n))
+        thesaurus = dict(zip(names[variants], names[canonical[variants]]))
+        self.logger.info(f"Thesaurus contains {len(thesaurus)} replacements in {len(np.unique(roots[variants]))} clusters")
+        return thesaurus
+
+    def update(self, index, authors, surnames, initials, counts=None) -> dict:
+        """ Add new names to an existing thesaurus
+
+        Only the names missing from the index are compared, against the
+        canonical names of the index and against each other, so the cost
+        depends on the number of new names. A new name may also join two
+        existing clusters, then the less frequent canonical name is replaced;
+        the counts of the known names are added to the index first.
+
+        The result only approximates a full build: new names are scored with
+        the TF-IDF weights of the last full build and their n-grams missing
+        from its vocabulary are ignored, so variants a full build would join
+        may stay apart. ThesaurusIndex.rebuild_reason tells when the index has
+        drifted too far and a full build is due.
+
+        :param index: ThesaurusIndex of the previous run, updated in place
+        :return: the full thesaurus {variant: canonical spelling}
+        """
+
+        new = pd.DataFrame({
+            'name': pd.Series(authors).to_numpy(),
+            'surname': pd.Series(surnames).to_numpy(),
+            'initials': pd.Series(initials).to_numpy(),
+            'count': np.ones(len(authors)) if counts is None else np.asarray(counts),
+        })
+        index.add_counts(new['name'], new['count'])
+        new = new[~new['name'].isin(index.known_names())].drop_duplicates('name').reset_index(drop=True)
+        if new.empty:
+            self.logger.info("No new names, thesaurus is up to date")
+            return index.thesaurus()
+
+        canonical = index.canonical_entries()
+        first_new = len(canonical)
+        combined = pd.concat([canonical, new], ignore_index=True)
+        new_matrix = index.vectorizer().transform(new['surname'])
+        matrix = sparse.vstack([index.matrix, new_matrix]).tocsr()
+
+        i, j, similarity = self.matching_pairs(matrix, combined['surname'], combined['initials'], first_new)
+        roots = self.cluster(len(combined), i, j, similarity, combined['initials'])
+        winners = combined['name'].to_numpy()[self.canonical_names(roots, combined['count'])]
+
+        index.merge(winners[:first_new], new.assign(canonical=winners[first_new:]), new_matrix)
+        self.logger.info(f"Added {len(new)} new names to the thesaurus index")
+        return index.thesaurus()
+
+
+class ThesaurusIndex:
+    """ Persistent index of known author names for incremental thesaurus updates
+
+    Keeps every known name with its canonical spelling and number of
+    mentions, the parameters and TF-IDF vocabulary of the full build and the
+    TF-IDF vectors of the canonical names, whose rows follow the order of the
+    canonical names in the names table.
+
+    The vocabulary and IDF weights stay those of the full build, so the index
+    also tracks how far incremental updates have drifted from it: the share
+    of n-gram occurrences of all names missing from the vocabulary, and the
+    change of the IDF weights on all known names.
+
+     Attributes
+     ----------
+     params: dict
+        ThesaurusBuilder.params() of the full build
+     ngrams: int
+        n-gram occurrences in the surnames of all names
+     unseen_ngrams: int
+        n-gram occurrences of the names added after the full build that are missing from the vocabulary
+    """
+
+    logger = logging.getLogger(__name__)
+
+    # Drift of the index that makes build_thesaurus rebuild it from scratch
+    MAX_UNSEEN_NGRAMS = 0.005
+    MAX_IDF_DRIFT = 0.01
+
+    def __init__(self, names, vocabulary, idf, ngram_range, matrix, params=None, ngrams=0, unseen_ngrams=0):
+        self.names = names
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.ngram_range = tuple(ngram_range)
+        self.matrix = matrix
+        self.params = params
+        self.ngrams = ngrams
+        self.unseen_ngrams = unseen_ngrams
+
+    @classmethod
+    def from_build(cls, builder, authors, surnames, initials, counts, thesaurus) -> 'ThesaurusIndex':
+        """ Index of a full ThesaurusBuilder.build run """
+
+        names = pd.DataFrame({
+            'name': pd.Series(authors).to_numpy(),
+            'surname': pd.Series(surnames).to_numpy(),
+            'initials': pd.Series(initials).to_numpy(),
+            'count': pd.Series(counts).to_numpy(),
+        })
+        names['canonical'] = names['name'].map(thesaurus).fillna(names['name'])
+        is_canonical = (names['name'] == names['canonical']).to_numpy()
+        vectorizer = builder.vectorizer
+        return cls(names, vectorizer.vocabulary_, vectorizer.idf_, builder.ngram_range, builder.matrix[is_canonical],
+                   params=builder.params(), ngrams=cls.count_ngrams(names['surname'], builder.ngram_range))
+
+    @classmethod
+    def load(cls, path) -> 'ThesaurusIndex':
+        path = Path(path)
+        names = pd.read_csv(path / 'names.tsv', sep='\t', dtype=str, keep_default_na=False)
+        names['count'] = names['count'].astype(float)
+        with open(path / 'vectorizer.json', 'r', encoding='utf-8') as f:
+            vectorizer = json.load(f)
+        matrix = sparse.load_npz(path / 'canonical_tfidf.npz').tocsr()
+        cls.logger.info(f"Loaded thesaurus index with {len(names)} names from {path}")
+        # Indexes saved before the parameters were kept have none and are rebuilt
+        return cls(names, vectorizer['vocabulary'], np.array(vectorizer['idf']), vectorizer['ngram_range'], matrix,
+                   params=vectorizer.get('params'), ngrams=vectorizer.get('ngrams', 0),
+                   unseen_ngrams=vectorizer.get('unseen_ngrams', 0))
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(exist_ok=True, parents=True)
+        self.names.to_csv(path / 'names.tsv', sep='\t', index=False)
+        with open(path / 'vectorizer.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'ngram_range': list(self.ngram_range),
+                'vocabulary': {gram: int(column) for gram, column in self.vocabulary.items()},
+                'idf': self.idf.tolist(),
+                'params': self.params,
+                'ngrams': int(self.ngrams),
+                'unseen_ngrams': int(self.unseen_ngrams),
+            }, f, ensure_ascii=False)
+        sparse.save_npz(path / 'canonical_tfidf.npz', self.matrix)
+        self.logger.info(f"Thesaurus index with {len(self.names)} names saved to: {path}")
+
+    def vectorizer(self) -> TfidfVectorizer:
+        vectorizer = TfidfVectorizer(analyzer='char', ngram_range=self.ngram_range, vocabulary=self.vocabulary)
+        vectorizer.idf_ = self.idf
+        return vectorizer
+
+    def known_names(self) -> set:
+        return set(self.names['name'])
+
+    @staticmethod
+    def count_ngrams(surnames, ngram_range) -> int:
+        """ Number of character n-gram occurrences in the surnames """
+
+        lengths = pd.Series(surnames, dtype=object).str.len().to_numpy()
+        low, high = ngram_range
+        return int(sum(np.clip(lengths - size + 1, 0, None).sum() for size in range(low, high + 1)))
+
+    def unseen_ngram_count(self, surnames) -> int:
+        """ Number of n-gram occurrences in the surnames that are missing from the vocabulary """
+
+        surnames = pd.Series(surnames, dtype=object)
+        if surnames.empty:
+            return 0
+        counter = CountVectorizer(analyzer='char', ngram_range=self.ngram_range, lowercase=False)
+        try:
+            counts = np.asarray(counter.fit_transform(surnames).sum(axis=0)).ravel()
+        except ValueError:
+            # Only empty surnames
+            return 0
+        unseen = np.array([gram not in self.vocabulary for gram in counter.get_feature_names_out()], dtype=bool)
+        return int(counts[unseen].sum())
+
+    def idf_drift(self, surnames) -> float:
+        """ Relative change of the IDF weights when the surnames are added to the known ones,
+        weighted by the document frequency of every n-gram """
+
+        surnames = pd.concat([self.names['surname'], pd.Series(surnames, dtype=object)], ignore_index=True)
+        counter = CountVectorizer(analyzer='char', ngram_range=self.ngram_range, vocabulary=self.vocabulary,
+                                  binary=True, lowercase=False)
+        frequency = np.asarray(counter.transform(surnames).sum(axis=0)).ravel()
+        # The smoothed IDF of TfidfVectorizer
+        idf = np.log((1 + len(surnames)) / (1 + frequency)) + 1
+        total = (frequency * self.idf).sum()
+        return float((frequency * np.abs(idf - self.idf)).sum() / total) if total else 0.0
+
+    def rebuild_reason(self, builder, new_surnames):
+        """ Why an update with the new surnames would not approximate a full build, None if it would """
+
+        if self.params != builder.params():
+            return f"the index was built with other parameters: {self.params}"
+        unseen = self.unseen_ngrams + self.unseen_ngram_count(new_surnames)
+        ngrams = self.ngrams + self.count_ngrams(new_surnames, self.ngram_range)
+        if ngrams and unseen / ngrams > self.MAX_UNSEEN_NGRAMS:
+            return f"{unseen / ngrams:.1%} of the n-grams are missing from the vocabulary"
+        drift = self.idf_drift(new_surnames)
+        if drift > self.MAX_IDF_DRIFT:
+            return f"the IDF weights changed by {drift:.1%}"
+        return None
+
+    def add_counts(self, names, counts):
+        """ Add the mentions of a new run to the counts of the known names """
+
+        added = pd.Series(np.asarray(counts, dtype=float), index=pd.Series(names).to_numpy()).groupby(level=0).sum()
+        self.names['count'] = self.names['count'] + self.names['name'].map(added).fillna(0)
+
+    def canonical_entries(self) -> pd.DataFrame:
+        """ Canonical names in the order of the matrix rows """
+
+        entries = self.names[self.names['name'] == self.names['canonical']]
+        return entries[['name', 'surname', 'initials', 'count']].reset_index(drop=True)
+
+    def merge(self, old_winners, new, new_matrix):
+        """ Apply the result of an incremental update
+
+        :param old_winners: new canonical name of every current canonical name
+        :param new: new names with their canonical spelling
+        :param new_matrix: TF-IDF vectors of the new names
+        """
+
+        old_canonical = self.canonical_entries()['name'].to_numpy()
+        replaced = dict(zip(old_canonical[old_winners != old_canonical], old_winners[old_winners != old_canonical]))
+        if replaced:
+            self.names['canonical'] = self.names['canonical'].replace(replaced)
+
+        self.ngrams += self.count_ngrams(new['surname'], self.ngram_range)
+        self.unseen_ngrams += self.unseen_ngram_count(new['surname'])
+        new_is_canonical = (new['name'] == new['canonical']).to_numpy()
+        self.matrix = sparse.vstack([self.matrix[old_winners == old_canonical], new_matrix[new_is_canonical]]).tocsr()
+        self.names = pd.concat([self.names, new[self.names.columns]], ignore_index=True)
+
+    def thesaurus(self) -> dict:
+        variants = self.names[self.names['name'] != self.names['canonical']]
+        return dict(zip(variants['name'], variants['canonical']))
+
+
+def count_authors(paths, chunksize=CHUNKSIZE) -> pd.DataFrame:
+    """ Distinct author names with their number of mentions
+
+    The 'Authors' column is read in chunks and only the running counts of the
+    distinct names are kept, so memory does not depend on the number of rows.
+    Names are ordered by their first mention.
+
+    :param paths: publications.csv files
+    :return: DataFrame with 'Authors' and 'Count' columns
+    """
+
+    counts = {}
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=['Authors'], chunksize=chunksize):
+            authors = chunk['Authors'].dropna().str.split('; ').explode()
+            authors = authors[~authors.str.strip().str.lower().str.endswith(('et al.', 'et al'))]
+            chunk_counts = authors.value_counts(sort=False)
+            for name, count in zip(chunk_counts.index, chunk_counts.to_numpy()):
+                counts[name] = counts.get(name, 0) + count
+        logger.info(f"Read authors from {path}: {len(counts)} distinct names so far")
+    return pd.DataFrame({'Authors': list(counts), 'Count': list(counts.values())})
+
+
+def build_thesaurus(authors, builder, index_dir=None, full_rebuild=False) -> dict:
+    """ Thesaurus for the counted authors
+
+    With an existing index in index_dir only the authors missing from it are
+    compared and the counts of the known ones are added to the index, so every
+    input should be counted once. An incremental result only approximates a
+    full build, so the thesaurus is built from scratch from all names of the
+    index and the authors when the index was built with other parameters or
+    has drifted too far (ThesaurusIndex.rebuild_reason). The index is saved
+    back when index_dir is given.
+
+    :param authors: result of count_authors
+    :param builder: ThesaurusBuilder
+    :return: {variant: canonical spelling}
+    """
+
+    normalizer = AuthorNameNormalizer()
+    if index_dir is not None and not full_rebuild and (Path(index_dir) / 'names.tsv').exists():
+        index = ThesaurusIndex.load(index_dir)
+        authors = authors.join(normalizer.normalize(authors['Authors']))
+        is_new = ~authors['Authors'].isin(index.known_names())
+        reason = index.rebuild_reason(builder, authors.loc[is_new, 'Surnames'])
+        if reason is None:
+            logger.info(f"Searching for similar surnames for {is_new.sum()} new authors")
+            thesaurus = builder.update(index, authors['Authors'], authors['Surnames'], authors['Initials'],
+                                       authors['Count'])
+            index.save(index_dir)
+            return thesaurus
+        logger.warning(f"Rebuilding the thesaurus index from scratch: {reason}")
+        known = index.names[['name', 'count']].set_axis(['Authors', 'Count'], axis=1)
+        authors = pd.concat([known, authors[['Authors', 'Count']]], ignore_index=True)
+        authors = authors.groupby('Authors', sort=False, as_index=False)['Count'].sum()
+
+    authors = authors.join(normalizer.normalize(authors['Authors']))
+    logger.info(f"Searching for similar surnames for {len(authors)} authors")
+    thesaurus = builder.build(authors['Authors'], authors['Surnames'], authors['Initials'], authors['Count'])
+    if index_dir is not None:
+        ThesaurusIndex.from_build(
+            builder, authors['Authors'], authors['Surnames'], authors['Initials'], authors['Count'], thesaurus
+        ).save(index_dir)
+    return thesaurus
+
+
+def save_thesaurus(thesaurus, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Label\tReplace by\n")
+        for label, replace_by in thesaurus.items():
+            f.write(f"{label}\t{replace_by}\n")
+    logger.info(f"Thesaurus with {len(thesaurus)} replacements saved to: {path}")
+
+
+class _Progress:
+    """ Logs the share of compared names and the throughput of the similarity search """
+
+    def __init__(self, logger, tasks, parts=20):
+        self.logger = logger
+        self.total = sum(len(rows) * len(columns) for rows, columns in tasks)
+        self.tasks = len(tasks)
+        self.step = max(1, self.total // parts)
+        self.compared = 0
+        self.finished = 0
+        self.pairs = 0
+        self.next_report = self.step
+        self.start = time.perf_counter()
+
+    def done(self, rows, columns, result):
+        self.compared += len(rows) * len(columns)
+        self.finished += 1
+        self.pairs += len(result[0])
+        if self.compared >= self.next_report and self.finished < self.tasks:
+            self.next_report = self.compared + self.step
+            self.report('Compared')
+
+    def report(self, prefix):
+        elapsed = time.perf_counter() - self.start
+        rate = self.compared / elapsed if elapsed > 0 else 0.0
+        self.logger.info(
+            f"{prefix} {self.compared}/{self.total} name pairs ({self.finished}/{self.tasks} tasks), "
+            f"{self.pairs} matches, {rate:,.0f} pairs/s"
+        )
+
+    def finish(self):
+        self.report('Finished:')
+
+
+_worker = {}
+
+
+def _init_worker(builder, matrix, features):
+    _worker.update(builder=builder, matrix=matrix, features=features)
+
+
+def _match_in_worker(rows, columns):
+    return _worker['builder'].match_task(_worker['matrix'], _worker['features'], rows, columns)
+
+
+class DisjointSet:
+    """ Union-find over integer ids with path halving and union by size """
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, root1: int, root2: int) -> int:
+        """ Join two roots and return the root of the union """
+
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+        return root1
@@ -1,6 +1,23 @@
 import re
 import time
 
+ITEM_ID_PATTERN = re.compile(r'item\.asp\?id=(\d+)')
+
+
+def canonical_publication_id(link: str, title: str = '', year=None):
+    """ Stable publication key: the eLibrary item id from the link,
+    or the normalized title and year for publications without one;
+    None when there is neither an item id nor a title to tell the publication apart """
+
+    match = ITEM_ID_PATTERN.search(link or '')
+    if match:
+        return match.group(1)
+    title = ' '.join(str(title or '').lower().split())
+    if title in ('', Publication.missing_value):
+        return None
+    return f"{title}|{year}"
+
+
 class Publication:
     """ Storing information about publications
     Finds similarities between given authors
@@ -28,6 +45,12 @@ class Publication:
         
     missing_value = '-'
 
+    @property
+    def canonical_id(self):
+        """ Publication key that does not depend on citations or formatting, None if there is none """
+
+        return canonical_publication_id(self.link, self.title, self.year)
+
     def to_csv_row(self) -> str:
         """ Create a table row with comma between the elements """
 
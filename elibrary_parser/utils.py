@@ -1,2 +1,8 @@
+from .overlap import PublicationOverlap
+
+
 def find_common_publications(publications):
-    return set.intersection(*publications)
+    """ Publications present in every given collection, matched by canonical id """
+
+    overlap = PublicationOverlap.from_publications(dict(enumerate(publications)))
+    return set(overlap.common_publications(*overlap.org_ids))
@@ -1,29 +1,252 @@
-
+import argparse
+import json
 import logging
-from elibrary_parser.downloader import Downloader
+import pickle
+
+from pathlib import Path
+
 from elibrary_parser.html_parser import ElibraryHTMLParser
+from elibrary_parser.instrumentation import Metrics
+from elibrary_parser.jobs import JobState, Stage, StageScheduler
+from elibrary_parser.logging_config import setup_logging
 from elibrary_parser.serializer import PublicationSerializer
-from elibrary_parser import logging_config 
+
+# Selenium (download, citations), scikit-learn (thesaurus) and SciPy (network) take seconds to import,
+# so the stages import them when they run: the CLI and the worker processes of other stages start quickly
 
 logger = logging.getLogger(__name__)
 
-def run_scraper(org_id: str, headless: bool = True):
-    logger.info(f"Starting scraping process for organization ID: {org_id}")
+# Parameter profiles; --profiles-file adds or overrides them
+PROFILES = {
+    'default': {
+        'headless': True,
+        'similarity_coefficient': 0.8,
+        'surname_diff': 3,
+        'thesaurus_jobs': 1,
+        'min_documents': 1,
+        'max_authors': 25,
+        'resolution': 1.0,
+        'field_normalization': False,
+        # Search parameters of the download, see Downloader.enable_parameters; the ones a profile
+        # leaves out are asked on the console, 'search': None asks for all of them
+        'search': {
+            'rubrics': [], 'titles': [], 'orgs': [], 'authors': [], 'years': [], 'types': [], 'roles': [],
+            'orgroles': [],
+            'orgdepid': None, 'show_option': None, 'show_sotr': None, 'sortorder': None, 'order': None,
+            'show_refs': False, 'hide_doubles': True,
+        },
+    },
+    'browser': {
+        'headless': False,
+    },
+    'interactive': {
+        'search': None,
+    },
+    'strict': {
+        'similarity_coefficient': 0.9,
+        'surname_diff': 2,
+        'min_documents': 2,
+    },
+}
+STAGE_NAMES = ['download', 'parse', 'serialize', 'thesaurus', 'network']
+REFRESH_STAGE_NAMES = ['citations', 'network']
 
-    with Downloader(org_id=org_id, data_path='data/', headless=headless) as downloader:
+
+def stage_metrics(org_id, profile, stage):
+    if profile.get('report_dir') is None:
+        return Metrics(enabled=False), None
+    return Metrics(), Path(profile['report_dir']) / org_id / stage
+
+
+def download(org_id, profile) -> dict:
+    from elibrary_parser.downloader import Downloader
+
+    metrics, report_dir = stage_metrics(org_id, profile, 'download')
+    with Downloader(org_id=org_id, data_path=profile['data_path'], headless=profile['headless'],
+                    metrics=metrics) as downloader:
         downloader.create_raw_dir()
-        downloader.find_publications()
+        downloader.find_publications(search=profile['search'])
+        pages = len(list(downloader.files_dir.glob('page_*.html')))
+    metrics.save(report_dir)
+    return {'items': pages}
+
+
+def parsed_path(org_id, profile) -> Path:
+    return Path(profile['data_path']) / 'raw' / org_id / 'publications.pkl'
+
+
+def parse(org_id, profile) -> dict:
+    metrics, report_dir = stage_metrics(org_id, profile, 'parse')
+    publications = ElibraryHTMLParser(org_id=org_id, data_path=profile['data_path'], metrics=metrics).parse_publications()
+    # The serialize stage may run in another process or in a later run
+    with open(parsed_path(org_id, profile), 'wb') as file:
+        pickle.dump(publications, file)
+    metrics.save(report_dir)
+    return {'items': len(publications)}
+
+
+def serialize(org_id, profile) -> dict:
+    metrics, report_dir = stage_metrics(org_id, profile, 'serialize')
+    with open(parsed_path(org_id, profile), 'rb') as file:
+        publications = pickle.load(file)
+    PublicationSerializer(org_id=org_id, data_path=profile['data_path'], metrics=metrics).save_publications_to_csv(
+        publications)
+    metrics.save(report_dir)
+    return {'items': len(publications)}
+
+
+def citations(org_id, profile) -> dict:
+    from elibrary_parser.downloader import Downloader
+
+    # Only the listing pages are read and only item ids and citations are taken from them
+    metrics, report_dir = stage_metrics(org_id, profile, 'citations')
+    counts = {}
+    with Downloader(org_id=org_id, data_path=profile['data_path'], headless=profile['headless'],
+                    metrics=metrics) as downloader:
+        for source in downloader.listing_pages(parameters=False):
+            with metrics.timer('parser_citations_seconds'):
+                counts.update(ElibraryHTMLParser.parse_citations(source))
+    changes = PublicationSerializer(org_id=org_id, data_path=profile['data_path'],
+                                    metrics=metrics).update_citations(counts)
+    metrics.save(report_dir)
+    return {'items': len(counts), **changes}
+
+
+def thesaurus(org_id, profile) -> dict:
+    from elibrary_parser.thesaurus import ThesaurusBuilder, build_thesaurus, count_authors, save_thesaurus
 
-    parser = ElibraryHTMLParser(org_id=org_id)
-    publications = parser.parse_publications()
+    files_dir = Path(profile['data_path']) / 'processed' / org_id
+    builder = ThesaurusBuilder(
+        similarity_coefficient=profile['similarity_coefficient'],
+        surname_diff=profile['surname_diff'],
+        n_jobs=profile['thesaurus_jobs'],
+    )
+    authors = count_authors([files_dir / 'publications.csv'])
+    # publications.csv has all the publications of the organization, an update would count the known ones twice
+    replacements = build_thesaurus(authors, builder, index_dir=files_dir / 'thesaurus_index', full_rebuild=True)
+    save_thesaurus(replacements, files_dir / 'thesaurus_authors.txt')
+    return {'items': len(authors)}
 
-    serializer = PublicationSerializer(org_id=org_id)
-    serializer.save_publications_to_csv(publications)
 
+def network(org_id, profile) -> dict:
+    from elibrary_parser.author_metrics import AuthorMetrics
+    from elibrary_parser.network import CoauthorshipNetworkBuilder
+
+    builder = CoauthorshipNetworkBuilder(
+        org_id=org_id,
+        data_path=profile['data_path'],
+        min_documents=profile['min_documents'],
+        max_authors=profile['max_authors'],
+        resolution=profile['resolution'],
+        metrics=AuthorMetrics(normalize_by=('Source ID', 'Year') if profile['field_normalization'] else ('Year',))
+    )
+    nodes, edges = builder.build()
+    builder.save(nodes, edges)
+    return {'items': len(nodes)}
+
+
+def run_scraper(org_id: str, headless: bool = True, report_dir: str = None):
+    """ Download, parse and save the publications of an organization in this process;
+    with report_dir the timings and counters of every stage are saved in report_dir/<org_id>/<stage> """
+
+    profile = {**PROFILES['default'], 'headless': headless, 'data_path': 'data/',
+               'report_dir': str(report_dir) if report_dir else None}
+    logger.info(f"Starting scraping process for organization ID: {org_id}")
+    for stage in (download, parse, serialize):
+        stage(org_id, profile)
     logger.info(f"Scraping and processing for organization ID {org_id} completed successfully.")
 
-if __name__ == "__main__":
-    target_org_id = '14346'
-    target_headless_mode = False
 
-    run_scraper(target_org_id, target_headless_mode)
+def build_stages(concurrency) -> list:
+    # The download may ask on the console (search parameters, captcha), so it runs in threads of this process
+    return [
+        Stage('download', download, concurrency.get('download', 1), executor='thread', params=['data_path', 'search']),
+        Stage('citations', citations, concurrency.get('citations', 1), executor='thread', params=['data_path']),
+        Stage('parse', parse, concurrency.get('parse', 2), params=['data_path']),
+        Stage('serialize', serialize, concurrency.get('serialize', 2), params=['data_path']),
+        Stage('thesaurus', thesaurus, concurrency.get('thesaurus', 1),
+              params=['data_path', 'similarity_coefficient', 'surname_diff']),
+        Stage('network', network, concurrency.get('network', 2),
+              params=['data_path', 'min_documents', 'max_authors', 'resolution', 'field_normalization']),
+    ]
+
+
+def parse_concurrency(values) -> dict:
+    concurrency = {}
+    for value in values:
+        stage, _, workers = value.partition('=')
+        if stage not in STAGE_NAMES + REFRESH_STAGE_NAMES or not workers.isdigit() or int(workers) < 1:
+            raise argparse.ArgumentTypeError(f"expected <stage>=<workers>, got '{value}'")
+        concurrency[stage] = int(workers)
+    return concurrency
+
+
+def merge_search(default, own):
+    """ Search parameters of a profile: the ones it sets over those of the default profile """
+
+    if own is None or default is None:
+        return own
+    return {**default, **own}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Download and process publications of organizations')
+    parser.add_argument('organizations', nargs='+',
+                        help='organization IDs, <org_id>:<profile> to give an organization its own profile')
+    parser.add_argument('--profile', default='default', help=f"profile of the organizations: {', '.join(PROFILES)}")
+    parser.add_argument('--profiles-file', type=Path, help='JSON file {profile name: {parameter: value}}')
+    parser.add_argument('--data-path', default='data/')
+    parser.add_argument('--stages', nargs='+', choices=STAGE_NAMES, default=STAGE_NAMES,
+                        help='stages to run, in pipeline order')
+    parser.add_argument('--concurrency', nargs='+', default=[],
+                        help='jobs of a stage run at once, e.g. parse=4 network=2')
+    parser.add_argument('--state-file', type=Path, help='job state, jobs.json in the data path by default')
+    parser.add_argument('--report-dir', type=Path, help='save download, parse and serialize metrics of every organization')
+    parser.add_argument('--force', action='store_true', help='run the stages even if they are done')
+    parser.add_argument('--refresh-citations', action='store_true',
+                        help='update the citations of the saved publications from the listing pages '
+                             'and rebuild the networks instead of the full pipeline')
+    args = parser.parse_args()
+    setup_logging()
+
+    profiles = dict(PROFILES)
+    if args.profiles_file:
+        with open(args.profiles_file, encoding='utf-8') as file:
+            profiles.update(json.load(file))
+
+    org_profiles = {}
+    for item in args.organizations:
+        org_id, _, profile_name = item.partition(':')
+        profile_name = profile_name or args.profile
+        if profile_name not in profiles:
+            parser.error(f"unknown profile '{profile_name}'")
+        # Profiles other than the default one only list what they change
+        org_profiles[org_id] = {
+            **profiles['default'], **profiles[profile_name],
+            'search': merge_search(profiles['default'].get('search'),
+                                   profiles[profile_name].get('search', profiles['default'].get('search'))),
+            'data_path': args.data_path,
+            'report_dir': str(args.report_dir) if args.report_dir else None,
+        }
+
+    try:
+        concurrency = parse_concurrency(args.concurrency)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    # A refresh is never done: it runs every time, followed by the network with the new citations
+    stage_names = REFRESH_STAGE_NAMES if args.refresh_citations else args.stages
+    stages = [stage for stage in build_stages(concurrency) if stage.name in stage_names]
+    state = JobState(args.state_file or Path(args.data_path) / 'jobs.json')
+
+    report = StageScheduler(stages, state, force=args.force or args.refresh_citations).run(org_profiles)
+
+    logger.info(f"Completed {report['completed']} of {report['organizations']} organizations "
+                f"in {report['seconds']:.1f} s ({report['organizations_per_hour'] or 0:.1f} per hour)")
+    for name, totals in report['stages'].items():
+        rate = f"{totals['items_per_second']:.1f} items/s" if totals['items_per_second'] else '-'
+        logger.info(f"{name:>10}: run {totals['run']}, skipped {totals['skipped']}, failed {totals['failed']}, "
+                    f"{totals['seconds']:.1f} s, {totals['items']} items, {rate}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import csv
+
+from bs4 import BeautifulSoup
+
+from elibrary_parser.html_parser import ElibraryHTMLParser
+from elibrary_parser.serializer import PublicationSerializer
+from elibrary_parser.types import ITEM_ID_PATTERN
+
+PAGE = '''<html><body>
+<table><tr><td><a href="/item.asp?id=1">before the results</a></td><td>5</td></tr></table>
+<table id="restab">
+<tr><td>1.</td>
+<td align="left" valign="top"><a href="/item.asp?id=9"><span style="line-height:1.0;">Title</span></a>
+<table width="100%" cellspacing="0"><tr><td>nested</td></tr></table>
+<a href="/item.asp?id=77">other version</a></td>
+<td align="center"><font> 12&nbsp;</font></td></tr>
+<TR><td>2.</td><td align="left" valign="top"><a href="/item.asp?id=10">Second</a></td><td align="center"></td></TR>
+</table>
+<table><tr><td><a href="item.asp?id=5">after the results</a></td><td>99</td></tr></table>
+</body></html>'''
+
+HEADER = ['Authors', 'Title', 'Year', 'Source title', 'Cited by', 'Link', 'Source ID']
+
+
+def test_parse_citations_reads_the_results_table():
+    assert ElibraryHTMLParser.parse_citations(PAGE) == {'9': '12', '10': ''}
+    assert ElibraryHTMLParser.parse_citations('<html><table><tr><td>1</td></tr></table></html>') == {}
+
+
+def test_parse_citations_agrees_with_the_tree_parser():
+    cells = ElibraryHTMLParser.create_table_cells(BeautifulSoup(PAGE, 'html.parser'))
+    expected = {ITEM_ID_PATTERN.search(ElibraryHTMLParser.get_link(cell)).group(1): ElibraryHTMLParser.get_cited_by(cell)
+                for cell in cells}
+
+    assert ElibraryHTMLParser.parse_citations(PAGE) == expected
+
+
+def write_publications(tmp_path, rows):
+    csv_path = tmp_path / 'processed' / 'org' / 'publications.csv'
+    csv_path.parent.mkdir(parents=True)
+    with open(csv_path, 'w', encoding='utf-8', newline='') as csvfile:
+        csv.writer(csvfile).writerows([HEADER] + rows)
+    return csv_path
+
+
+def row(cited_by, link):
+    return ['Иванов И.И.', 'Title', '2020', 'Journal', cited_by, link, '-']
+
+
+def read_citations(csv_path):
+    with open(csv_path, encoding='utf-8', newline='') as csvfile:
+        return [line['Cited by'] for line in csv.DictReader(csvfile)]
+
+
+def test_update_citations_replaces_the_counts(tmp_path):
+    csv_path = write_publications(tmp_path, [
+        row('1', 'https://www.elibrary.ru/item.asp?id=9'),
+        row('3', 'https://www.elibrary.ru/item.asp?id=10'),
+        row('4', 'https://www.elibrary.ru/item.asp?id=11'),
+        row('7', '-'),
+    ])
+    csv_path.chmod(0o644)
+
+    changes = PublicationSerializer('org', data_path=tmp_path).update_citations({'9': '2', '10': '3', '42': '8'})
+
+    assert changes == {'updated': 1, 'missing': 1, 'unknown': 1}
+    assert read_citations(csv_path) == ['2', '3', '4', '7']
+    assert csv_path.stat().st_mode & 0o777 == 0o644
+    assert list(csv_path.parent.glob('*.tmp')) == []
+
+
+def test_unchanged_citations_keep_the_file(tmp_path):
+    csv_path = write_publications(tmp_path, [row('1', 'https://www.elibrary.ru/item.asp?id=9')])
+    mtime = csv_path.stat().st_mtime_ns
+
+    changes = PublicationSerializer('org', data_path=tmp_path).update_citations({'9': '1'})
+
+    assert changes == {'updated': 0, 'missing': 0, 'unknown': 0}
+    assert csv_path.stat().st_mtime_ns == mtime
@@ -0,0 +1,96 @@
+import builtins
+
+import pytest
+
+from elibrary_parser.downloader import Downloader
+from elibrary_parser.instrumentation import Metrics
+from main import PROFILES, merge_search
+
+
+class Element:
+    def click(self):
+        pass
+
+    def is_displayed(self):
+        return False
+
+
+class Driver:
+    def __init__(self):
+        self.searched = False
+
+    def find_element(self, by, value):
+        self.searched = self.searched or 'Поиск' in value
+        return Element()
+
+
+class PageDownloader(Downloader):
+    """ Downloader over a fake search form, records the clicks instead of using a browser """
+
+    def __init__(self):
+        self.driver = Driver()
+        self.metrics = Metrics(enabled=False)
+        self.clicked = []
+        self.selected = []
+
+    def get_span(self, something):
+        if something != 'years':
+            return {}
+        return {1: {'id': 'year_2023', 'name': '2023'}, 2: {'id': 'year_2024', 'name': '2024'}}
+
+    def get_select_option(self, select_id):
+        return {1: {'name': 'по дате', 'value': 'date'}, 2: {'name': 'по названию', 'value': 'title'}}
+
+    def click_checkbox_by_id(self, checkbox_id):
+        self.clicked.append(checkbox_id)
+        return True
+
+    def select_option_by_id(self, select_id, value, name):
+        self.selected.append((select_id, value))
+        return True
+
+
+@pytest.fixture
+def no_input(monkeypatch):
+    def fail(*args):
+        raise AssertionError('asked on the console')
+    monkeypatch.setattr(builtins, 'input', fail)
+
+
+def apply(search):
+    downloader = PageDownloader()
+    downloader.enable_parameters(search)
+    return downloader, downloader.driver.searched
+
+
+def test_default_profile_selects_nothing(no_input):
+    downloader, selected = apply(PROFILES['default']['search'])
+
+    assert not selected
+    assert downloader.clicked == [] and downloader.selected == []
+
+
+def test_profile_parameters_are_applied_without_questions(no_input):
+    search = merge_search(PROFILES['default']['search'],
+                          {'years': ['2024', '1999'], 'sortorder': 'по названию', 'show_refs': True,
+                           'hide_doubles': False})
+    downloader, selected = apply(search)
+
+    assert selected
+    assert downloader.clicked == ['year_2024', 'check_hide_doubles', 'check_show_refs']
+    assert downloader.selected == [('sortorder', 'title')]
+
+
+def test_missing_checkbox_states_are_asked(monkeypatch):
+    answers = iter(['y'])
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': next(answers))
+    downloader = PageDownloader()
+
+    assert downloader.select_checkbox_options(hide_doubles=True)
+    assert downloader.clicked == ['check_show_refs']
+
+
+def test_merge_search_keeps_interactive_profiles():
+    assert merge_search(PROFILES['default']['search'], None) is None
+    assert merge_search(None, {'years': ['2024']}) == {'years': ['2024']}
+    assert merge_search({'years': [], 'order': None}, {'order': 'desc'}) == {'years': [], 'order': 'desc'}
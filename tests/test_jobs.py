@@ -0,0 +1,50 @@
+from elibrary_parser.jobs import JobState, Stage, StageScheduler
+
+CALLS = []
+
+
+def first(org_id, profile):
+    CALLS.append(('first', org_id))
+    return {'items': 1}
+
+
+def second(org_id, profile):
+    CALLS.append(('second', org_id))
+    if org_id == 'broken':
+        raise ValueError('no data')
+    return {'items': 2}
+
+
+def stages():
+    return [Stage('first', first, 2, executor='thread', params=['size']),
+            Stage('second', second, 2, executor='thread')]
+
+
+def run(state_path, profiles, force=False):
+    CALLS.clear()
+    return StageScheduler(stages(), JobState(state_path), force=force).run(profiles)
+
+
+def test_done_stages_are_skipped_on_resume(tmp_path):
+    state_path = tmp_path / 'jobs.json'
+    profiles = {'a': {'size': 1}, 'broken': {'size': 1}}
+
+    report = run(state_path, profiles)
+    assert report['completed'] == 1
+    assert report['stages']['second']['failed'] == 1
+    assert JobState(state_path).get('broken', 'second')['status'] == 'failed'
+
+    report = run(state_path, profiles)
+    assert CALLS == [('second', 'broken')]
+    assert report['stages']['first']['skipped'] == 2 and report['stages']['second']['skipped'] == 1
+
+
+def test_changed_parameters_rerun_the_stage_and_the_next(tmp_path):
+    state_path = tmp_path / 'jobs.json'
+    run(state_path, {'a': {'size': 1}})
+
+    run(state_path, {'a': {'size': 2}})
+    assert CALLS == [('first', 'a'), ('second', 'a')]
+
+    run(state_path, {'a': {'size': 2}}, force=True)
+    assert CALLS == [('first', 'a'), ('second', 'a')]
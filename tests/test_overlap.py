@@ -0,0 +1,36 @@
+from elibrary_parser.overlap import PublicationOverlap
+from elibrary_parser.types import Publication, canonical_publication_id
+
+
+def publication(title, link='-', year='2020'):
+    pub = Publication(title=title, authors='Иванов И.И.', info='-', link=link, cited_by='0', source_id='-')
+    pub.year = year
+    return pub
+
+
+def test_canonical_id_prefers_item_id():
+    assert canonical_publication_id('https://www.elibrary.ru/item.asp?id=42', 'Title', '2020') == '42'
+    assert canonical_publication_id('-', '  Some   Title ', '2020') == 'some title|2020'
+    assert canonical_publication_id('-', '-', '-') is None
+    assert canonical_publication_id('', '', None) is None
+
+
+def test_overlap_counts_shared_publications():
+    overlap = PublicationOverlap.from_publications({
+        'a': [publication('One', 'item.asp?id=1'), publication('Two', 'item.asp?id=2'), publication('Three')],
+        'b': [publication('one (reprint)', 'item.asp?id=1'), publication('three'), publication('Four')],
+    })
+
+    assert overlap.overlap('a', 'b') == 2
+    assert overlap.pairwise_matrix().tolist() == [[3, 2], [2, 3]]
+    assert overlap.combinations() == {('a', 'b'): 2}
+
+
+def test_publications_without_id_and_title_are_not_common():
+    overlap = PublicationOverlap.from_publications({
+        'a': [publication('-', year='-'), publication('-', year='-')],
+        'b': [publication('-', year='-')],
+    })
+
+    assert overlap.overlap('a', 'b') == 0
+    assert overlap.common_publications('a', 'b') == []
@@ -0,0 +1,95 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from elibrary_parser.thesaurus import DisjointSet, ThesaurusBuilder, ThesaurusIndex, build_thesaurus
+
+BASE = pd.DataFrame({
+    'Authors': ['Иванов И.И.', 'Ivanov I.I.', 'Петрова А.Б.', 'Petrova A.B.', 'Сидоров С.С.'],
+    'Count': [5, 1, 3, 1, 2],
+})
+
+
+def test_disjoint_set_joins_transitively():
+    forest = DisjointSet(4)
+    forest.union(forest.find(0), forest.find(1))
+    forest.union(forest.find(1), forest.find(2))
+
+    assert forest.find(0) == forest.find(2)
+    assert forest.find(3) != forest.find(0)
+
+
+def test_cluster_refuses_conflicting_initials():
+    builder = ThesaurusBuilder()
+    initials = pd.Series(['i.i', 'i', 'i.p'])
+    roots = builder.cluster(3, np.array([0, 1]), np.array([1, 2]), np.array([1.0, 0.9]), initials)
+
+    assert roots[0] == roots[1]
+    assert roots[2] != roots[0]
+
+
+def test_build_picks_most_frequent_spelling():
+    thesaurus = build_thesaurus(BASE, ThesaurusBuilder())
+
+    assert thesaurus == {'Ivanov I.I.': 'Иванов И.И.', 'Petrova A.B.': 'Петрова А.Б.'}
+
+
+def test_index_round_trip(tmp_path):
+    builder = ThesaurusBuilder()
+    thesaurus = build_thesaurus(BASE, builder, index_dir=tmp_path)
+    index = ThesaurusIndex.load(tmp_path)
+
+    assert index.thesaurus() == thesaurus
+    assert index.params == builder.params()
+    assert index.matrix.shape[0] == len(index.canonical_entries())
+
+
+def test_update_adds_new_variants_and_counts(tmp_path, monkeypatch):
+    # Any update of so few names drifts too far, so the drift checks are turned off
+    monkeypatch.setattr(ThesaurusIndex, 'MAX_UNSEEN_NGRAMS', 1.0)
+    monkeypatch.setattr(ThesaurusIndex, 'MAX_IDF_DRIFT', 1.0)
+    build_thesaurus(BASE, ThesaurusBuilder(), index_dir=tmp_path)
+    new = pd.DataFrame({'Authors': ['Иванов И. И.', 'Ivanov I.I.', 'Козлов К.К.'], 'Count': [1, 10, 1]})
+
+    thesaurus = build_thesaurus(new, ThesaurusBuilder(), index_dir=tmp_path)
+    index = ThesaurusIndex.load(tmp_path)
+    counts = dict(zip(index.names['name'], index.names['count']))
+
+    assert thesaurus['Иванов И. И.'] == 'Иванов И.И.'
+    assert 'Козлов К.К.' not in thesaurus
+    assert counts['Ivanov I.I.'] == 11
+    assert counts['Иванов И.И.'] == 5
+    assert len(index.names) == 7
+
+
+def test_update_without_new_names_keeps_thesaurus(tmp_path):
+    thesaurus = build_thesaurus(BASE, ThesaurusBuilder(), index_dir=tmp_path)
+
+    assert build_thesaurus(BASE.iloc[:2], ThesaurusBuilder(), index_dir=tmp_path) == thesaurus
+
+
+def test_changed_parameters_rebuild_the_index(tmp_path, caplog):
+    build_thesaurus(BASE, ThesaurusBuilder(), index_dir=tmp_path)
+    builder = ThesaurusBuilder(ngram_range=(2, 3))
+
+    with caplog.at_level(logging.WARNING):
+        build_thesaurus(BASE.iloc[:1], builder, index_dir=tmp_path)
+
+    assert 'other parameters' in caplog.text
+    index = ThesaurusIndex.load(tmp_path)
+    assert index.params == builder.params()
+    assert index.ngram_range == (2, 3)
+    # The rebuild keeps the names of the index and adds the counts of the run
+    assert dict(zip(index.names['name'], index.names['count']))['Иванов И.И.'] == 10
+
+
+def test_drifted_index_is_rebuilt_like_a_full_build(tmp_path, caplog):
+    build_thesaurus(BASE, ThesaurusBuilder(), index_dir=tmp_path)
+    new = pd.DataFrame({'Authors': ['Ivanoff I.I.', 'Ivanoff I.I', 'Ivanoff I.'], 'Count': [4, 1, 1]})
+
+    with caplog.at_level(logging.WARNING):
+        incremental = build_thesaurus(new, ThesaurusBuilder(), index_dir=tmp_path)
+
+    assert 'Rebuilding' in caplog.text
+    assert incremental == build_thesaurus(pd.concat([BASE, new], ignore_index=True), ThesaurusBuilder())
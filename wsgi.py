@@ -0,0 +1,23 @@
+""" Production entry point of the dashboard
+
+    gunicorn wsgi:server --preload --workers 4 --threads 4 --bind 0.0.0.0:8050
+
+With --preload the module is imported once in the master process: the
+organizations listed in ELIBRARY_PRELOAD (comma-separated ids) are loaded
+before the workers fork and their arrays are shared copy-on-write. All state
+of a user's view lives in the browser (dcc.Store), so any worker can serve
+any request. Set ELIBRARY_RESULT_CACHE_DIR to share memoized results between
+the workers.
+"""
+import gc
+import os
+
+from app import organizations, server
+from elibrary_parser.logging_config import setup_logging
+
+PRELOAD = [org_id.strip() for org_id in os.environ.get('ELIBRARY_PRELOAD', '').split(',') if org_id.strip()]
+
+setup_logging()
+organizations.preload(PRELOAD)
+# Objects loaded so far are left alone by the garbage collector, which keeps their pages shared after fork
+gc.freeze()